@@ -1,8 +1,9 @@
 import argparse
 import logging
 import os
+import sys
 import textwrap
-from datetime import datetime
+from datetime import datetime, timezone
 
 from ranking_table_tennis.helpers.logging import logger
 
@@ -22,9 +23,22 @@ def main():
             (3) publish: provides formatted spreadsheets to upload rankings
             or
             automatic: combines (1) (2) (3) to resolve automatically
+            rebuild: runs automatic for several seasons in parallel
+            sweep: computes the season with variants of the config (after preprocess)
+            project: simulates the remaining tournaments of the season (after compute)
+            live: updates provisional ratings with each match read (after compute)
             """
         ),
-        choices=["preprocess", "compute", "publish", "automatic"],
+        choices=[
+            "preprocess",
+            "compute",
+            "publish",
+            "automatic",
+            "rebuild",
+            "sweep",
+            "project",
+            "live",
+        ],
     )
     parser.add_argument(
         "--log",
@@ -52,9 +66,74 @@ def main():
     )
     parser.add_argument(
         "--dont-download",
-        help="Preprocessing unattended and dont't downloading tournaments.",
+        help="Preprocessing unattended (or automatic) and dont't downloading tournaments.",
         action="store_true",
     )
+    parser.add_argument(
+        "--incremental",
+        help="Compute only tournaments after the last computed one, if previous inputs match.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--engine",
+        help="Engine to compute rankings, array keeps players in arrays. Same results.",
+        choices=["pandas", "array"],
+        default="pandas",
+    )
+    parser.add_argument(
+        "--seasons",
+        help="Seasons to rebuild, e.g. 2021-2026 or 2021,2023. Only valid if rebuild is given.",
+        default=str(datetime.now(timezone.utc).astimezone().year),
+    )
+    parser.add_argument(
+        "--jobs",
+        help="Number of seasons or variants computed in parallel. Defaults to the number of CPUs.",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--download",
+        help="Download tournaments of each season before rebuilding. Only valid with rebuild.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--grid",
+        help="Yaml file with the values to try of each config key. Only valid with sweep.",
+        default=None,
+    )
+    parser.add_argument(
+        "--remaining-tournaments",
+        help="Number of tournaments to simulate. Only valid if project is given.",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--simulations",
+        help="Number of simulated seasons. Only valid if project is given.",
+        type=int,
+        default=10000,
+    )
+    parser.add_argument(
+        "--seed",
+        help="Seed of simulations, to get reproducible projections.",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--matches",
+        help="Csv file with matches of the tournament being played, - for stdin. Used by live.",
+        default="-",
+    )
+    parser.add_argument(
+        "--follow",
+        help="Wait for matches appended to --matches until interrupted. Used by live.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--tournament-date",
+        help="Date (YYMMDD) of the tournament being played, today by default. Used by live.",
+        default=None,
+    )
     parser.add_argument(
         "--config-initial-date",
         help="Set the initial date to get the right configs and setup.",
@@ -95,30 +174,54 @@ def main():
     elif args.cmd == "compute":
         from ranking_table_tennis import compute_rankings
 
-        compute_rankings.main(args.config_initial_date)
+        compute_rankings.main(args.config_initial_date, args.incremental, args.engine)
     elif args.cmd == "publish":
         from ranking_table_tennis import publish
 
         publish.main(args.last, args.tournament_num, args.config_initial_date)
     elif args.cmd == "automatic":
-        from ranking_table_tennis import compute_rankings, preprocess_unattended, publish
-
-        # Download and preprocess with no prev rankings
-        preprocess_unattended.main(args.config_initial_date, download=True)
-        # Computing ratings so suggestions to new players can be given and assigned
-        compute_rankings.main(args.config_initial_date)
-        # preprocessing twice to assign rating as much as possible
-        preprocess_unattended.main(args.config_initial_date, download=False)
-        # New players that played only with new players might not be resolved. Try it one more time
-        preprocess_unattended.main(args.config_initial_date, download=False)
-        # Computing ratings to publish
-        n_processed_tournaments = compute_rankings.main(args.config_initial_date)
-        # Publish tournament
-        for tournament_n in range(1, n_processed_tournaments + 1):
-            publish.main(
-                tournament_num=tournament_n,
-                config_initial_date=args.config_initial_date,
-            )
+        from ranking_table_tennis import rebuild
+
+        # Without downloading, there are no updates of the spreadsheet to check
+        rebuild.run_season(
+            args.config_initial_date,
+            download=not args.dont_download,
+            check_updates=not args.dont_download,
+        )
+    elif args.cmd == "rebuild":
+        from ranking_table_tennis import rebuild
+
+        try:
+            seasons = rebuild.parse_seasons(args.seasons)
+            rebuild.check_isolated_files(seasons)
+        except ValueError as err:
+            parser.error(str(err))
+        failed_seasons = rebuild.main(seasons, args.jobs, args.download)
+        if failed_seasons:
+            logger.error("Failed to rebuild seasons: %s", failed_seasons)
+            sys.exit(1)
+    elif args.cmd == "sweep":
+        from ranking_table_tennis import sweep
+
+        if args.grid is None:
+            parser.error("--grid is required by sweep")
+        sweep.main(sweep.load_grid(args.grid), args.config_initial_date, args.jobs)
+    elif args.cmd == "project":
+        from ranking_table_tennis import projection
+
+        if args.remaining_tournaments is None:
+            parser.error("--remaining-tournaments is required by project")
+        projection.main(
+            args.remaining_tournaments,
+            args.simulations,
+            args.config_initial_date,
+            args.jobs or 1,
+            args.seed,
+        )
+    elif args.cmd == "live":
+        from ranking_table_tennis import live
+
+        live.main(args.matches, args.config_initial_date, args.follow, args.tournament_date)
     else:
         logger.error("you shouldn't see this message")
 
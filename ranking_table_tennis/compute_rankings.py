@@ -1,12 +1,20 @@
+import hashlib
 import logging
+from typing import Dict, List
 
-from ranking_table_tennis import helpers
+from omegaconf import OmegaConf
+
+from ranking_table_tennis import helpers, models
 from ranking_table_tennis.configs import ConfigManager
+from ranking_table_tennis.models.array_engine import ArrayEngine
 
 logger = logging.getLogger(__name__)
 
 
-def main(config_initial_date="220101") -> int:
+ENGINES = ("pandas", "array")
+
+
+def main(config_initial_date="220101", incremental=False, engine="pandas") -> int:
     """Compute rating and championship points of loaded tournaments.
 
     Function to run after preprocess.main().
@@ -14,6 +22,12 @@ def main(config_initial_date="220101") -> int:
     It will read players, tournaments in pickles.
     It will save players, tournaments and rankings in pickles.
 
+    If incremental=True it will resume from the rankings saved in pickles, computing only
+    tournaments after the last one saved. All rankings are computed from the beginning if
+    the inputs of a saved tournament have changed.
+
+    engine is "pandas" (default) or "array", see compute_tournaments.
+
     Returns the number of tournaments processed.
     """
     logger.info("Starting to compute rankings!")
@@ -34,12 +48,65 @@ def main(config_initial_date="220101") -> int:
 
     # Will compute all rankings from the beginning by default
     tids = [initial_tid] + [tid for tid in tournaments]
+    fingerprints = _inputs_fingerprints(tournaments, rankings)
+    rankings.inputs_fingerprints = {initial_tid: fingerprints[initial_tid]}
+
+    if incremental:
+        stored_rankings = _load_resumable_rankings(fingerprints)
+        if stored_rankings is not None:
+            rankings = stored_rankings
+
+    computed_tids = [tid for tid in tids[1:] if tid in rankings.inputs_fingerprints]
+    tids_to_compute = [tid for tid in tids[1:] if tid not in rankings.inputs_fingerprints]
+    if computed_tids:
+        logger.info("Resuming rankings computed up to %s", computed_tids[-1])
+        # Histories of computed tournaments are required to activate or inactivate players
+        for tid in computed_tids:
+            players.update_histories(tid, tournaments.compute_best_rounds(tid))
+        # Config is left as it was after computing the last tournament
+        tournament_date = tournaments[computed_tids[-1]].iloc[0].date.strftime("%y%m%d")
+        ConfigManager().set_current_config(date=tournament_date)
+        rankings.update_config()
 
-    for tid in tournaments:
+    compute_tournaments(tournaments, players, rankings, tids, tids_to_compute, engine=engine)
+    rankings.inputs_fingerprints.update({tid: fingerprints[tid] for tid in tids_to_compute})
+
+    # Statistics are cached per tid and saved with rankings, so publishing reuses them
+    rankings.get_statistics(tids[-1])
+
+    helpers.save_to_pickle(players=players, tournaments=tournaments, rankings=rankings)
+
+    return len(tids) - 1  # Exclude initial tid
+
+
+def compute_tournaments(
+    tournaments: models.Tournaments,
+    players: models.Players,
+    rankings: models.Rankings,
+    tids: List[str],
+    tids_to_compute: List[str],
+    engine: str = "pandas",
+) -> None:
+    """Compute rankings of tids_to_compute, updating rankings and histories of players.
+
+    tids are all tids in order, starting with the initial one. Rankings of the tids before
+    the ones to compute must be available. Config is left as it was for the last tid.
+
+    With engine="array" the state of players is kept in arrays while computing, see
+    ArrayEngine. Results are the same.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+    if engine == "array":
+        ArrayEngine(tournaments, players, rankings, tids).compute(tids_to_compute)
+        return
+
+    initial_tid = tids[0]
+    for tid in tids_to_compute:
         logger.info("** Computing %s", tid)
 
         # Get the tid of the previous tournament
-        prev_tid = tids[tids.index(tid) - 1]
+        prev_tid = tids[tournaments.get_ordinal(tid) - 1]
 
         # Previous ranking data will be the default for the new ranking
         rankings.initialize_new_ranking(tid, prev_tid)
@@ -48,7 +115,7 @@ def main(config_initial_date="220101") -> int:
         pid_participation_list = tournaments.get_players_pids(tid)
 
         # Get the best round for each player in each category
-        best_rounds = tournaments.compute_best_rounds(tid, players)
+        best_rounds = tournaments.compute_best_rounds(tid)
         # Best rounds reached in each category are saved into corresponding history
         players.update_histories(tid, best_rounds)
 
@@ -56,13 +123,11 @@ def main(config_initial_date="220101") -> int:
         # Fans category is not considered in this list
         # Old ranking need to be updated so known old players are not misclassified
         rankings.update_categories(tid)
+        not_own_category = rankings.get_not_own_category_mask(
+            tid, pid_participation_list, best_rounds
+        )
         pid_not_own_category = [
-            pid
-            for pid in pid_participation_list
-            if best_rounds[
-                (best_rounds.pid == pid) & (best_rounds.category == rankings[tid, pid, "category"])
-            ].empty
-            and rankings[tid, pid, "category"] != cfg.categories[-1]
+            pid for pid, not_own in zip(pid_participation_list, not_own_category) if not_own
         ]
 
         rankings.compute_new_ratings(tid, prev_tid, tournaments, pid_not_own_category)
@@ -87,9 +152,54 @@ def main(config_initial_date="220101") -> int:
         rankings.update_categories(tid)
         rankings.sort_rankings()
 
-    helpers.save_to_pickle(players=players, tournaments=tournaments, rankings=rankings)
 
-    return len(tids) - 1  # Exclude initial tid
+def _inputs_fingerprints(
+    tournaments: models.Tournaments, initial_rankings: models.Rankings
+) -> Dict[str, str]:
+    """Return chained fingerprints of the inputs of each tid.
+
+    The initial tid considers the initial ranking and the current config. Each tournament
+    adds its matches and the config valid at its date, so a change on the inputs of a tid
+    also changes the fingerprints of the following ones.
+    """
+    cfg = ConfigManager().current_config
+    initial_tid = cfg.initial_metadata.initial_tid
+
+    fingerprint = hashlib.sha256()
+    fingerprint.update(initial_rankings.fingerprint(initial_tid).encode())
+    fingerprint.update(OmegaConf.to_yaml(cfg).encode())
+    fingerprints = {initial_tid: fingerprint.hexdigest()}
+
+    for tid in tournaments:
+        tournament_date = tournaments[tid].iloc[0].date.strftime("%y%m%d")
+        tournament_cfg = ConfigManager().get_valid_config(tournament_date)
+        fingerprint.update(tournaments.fingerprint(tid).encode())
+        fingerprint.update(OmegaConf.to_yaml(tournament_cfg).encode())
+        fingerprints[tid] = fingerprint.hexdigest()
+
+    return fingerprints
+
+
+def _load_resumable_rankings(fingerprints: Dict[str, str]) -> models.Rankings | None:
+    """Return rankings saved in pickles if their inputs did not change, None otherwise."""
+    cfg = ConfigManager().current_config
+
+    try:
+        stored_rankings = helpers.load_from_pickle(cfg.io.pickle.rankings)
+    except FileNotFoundError:
+        logger.info("No rankings to resume, computing all rankings from the beginning")
+        return None
+
+    stored_fingerprints = stored_rankings.inputs_fingerprints
+    unchanged_inputs = all(
+        fingerprints.get(tid) == fingerprint for tid, fingerprint in stored_fingerprints.items()
+    )
+    stored_tids = set(stored_rankings.ranking_df.tid.unique())
+    if not stored_fingerprints or not unchanged_inputs or stored_tids != set(stored_fingerprints):
+        logger.info("Inputs have changed, computing all rankings from the beginning")
+        return None
+
+    return stored_rankings
 
 
 if __name__ == "__main__":
@@ -1,9 +1,11 @@
 import glob
 import logging
 import os
-from typing import List, Optional
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
 
 import hydra
+import numpy as np
 import pandas as pd
 from omegaconf import OmegaConf
 
@@ -13,13 +15,118 @@ AVAILABLE_CONFIGS = glob.glob(os.path.join(USER_CONFIG_PATH, "config_*_*.yaml"))
 logger = logging.getLogger(__name__)
 
 
+def _readonly(values) -> np.ndarray:
+    array = np.array(values)
+    array.setflags(write=False)
+    return array
+
+
+@dataclass(frozen=True, eq=False)
+class CompiledRules:
+    """Numeric form of the rule tables of a config, built once and shared by hot paths.
+
+    Result tables are arrays of rows (diff_threshold, points_to_winner, points_to_loser)
+    sorted by threshold. Best rounds points are a categories x rounds matrix. Round order is
+    an ordered categorical of round names, from lowest to highest priority.
+    """
+
+    expected_result_table: np.ndarray
+    unexpected_result_table: np.ndarray
+    categories: Tuple[str, ...]
+    round_names: Tuple[str, ...]
+    round_priority: np.ndarray
+    round_order: pd.CategoricalDtype
+    best_rounds_points: np.ndarray
+    categories_thresholds: np.ndarray
+    rating_factor: float
+    category_expected_factor: float
+    category_unexpected_factor: float
+    sanction_factor: float
+
+    @classmethod
+    def from_config(cls, cfg: OmegaConf) -> "CompiledRules":
+        result_tables = []
+        for table_cfg in (cfg.expected_result_table, cfg.unexpected_result_table):
+            table = pd.DataFrame(OmegaConf.to_container(table_cfg, resolve=True)).to_numpy()
+            result_tables.append(_readonly(table[np.argsort(table[:, 0], kind="stable")]))
+
+        categories = tuple(cfg.categories)
+        points_df = pd.DataFrame(OmegaConf.to_container(cfg.best_rounds_points, resolve=True))
+        round_names = tuple(points_df["round_reached"])
+        priority = OmegaConf.to_container(cfg.best_rounds_priority, resolve=True)
+
+        return cls(
+            expected_result_table=result_tables[0],
+            unexpected_result_table=result_tables[1],
+            categories=categories,
+            round_names=round_names,
+            round_priority=_readonly([priority[name] for name in round_names]),
+            round_order=pd.CategoricalDtype(sorted(round_names, key=priority.get), ordered=True),
+            best_rounds_points=_readonly(points_df.loc[:, list(categories)].to_numpy().T),
+            categories_thresholds=_readonly(cfg.compute.categories_thresholds),
+            rating_factor=cfg.compute.rating_factor,
+            category_expected_factor=cfg.compute.category_expected_factor,
+            category_unexpected_factor=cfg.compute.category_unexpected_factor,
+            sanction_factor=cfg.compute.sanction_factor,
+        )
+
+    @staticmethod
+    def _codes(values, names: Tuple[str, ...]) -> np.ndarray:
+        return pd.Index(names).get_indexer(pd.Index(values))
+
+    def category_codes(self, categories) -> np.ndarray:
+        """Position of each category in categories, -1 if unknown."""
+        return self._codes(categories, self.categories)
+
+    def round_codes(self, rounds) -> np.ndarray:
+        """Position of each round in round_names, -1 if unknown."""
+        return self._codes(rounds, self.round_names)
+
+    def points_to_assign(self, rating_diff: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Points to add to winners and to deduce from losers given rating differences
+        (rating_winner - rating_loser) of matches, in an array of any shape."""
+        rating_diff = np.asarray(rating_diff, dtype=float)
+        unexpected = rating_diff < 0
+        abs_diff = np.abs(rating_diff)
+
+        points_to_winner = np.empty(rating_diff.shape, dtype=float)
+        points_to_loser = np.empty(rating_diff.shape, dtype=float)
+        for criteria, assignation_table in zip(
+            (~unexpected, unexpected), (self.expected_result_table, self.unexpected_result_table)
+        ):
+            # Select first row that is appropiate for given rating_diff
+            rows = np.searchsorted(assignation_table[:, 0], abs_diff[criteria], side="right")
+            points_to_winner[criteria] = assignation_table[rows, 1]
+            points_to_loser[criteria] = assignation_table[rows, 2]
+
+        return points_to_winner, points_to_loser
+
+    def rating_category_codes(self, rating: np.ndarray) -> np.ndarray:
+        """Position of the category of each rating, in an array of any shape.
+
+        The first category whose threshold is reached, or the last one that it's not the fan
+        category. Fan category is not assigned by thresholds.
+        """
+        n_categories = min(len(self.categories) - 2, len(self.categories_thresholds))
+        thresholds = self.categories_thresholds[:n_categories]
+
+        reached = np.asarray(rating)[..., np.newaxis] >= thresholds
+        return np.where(reached.any(axis=-1), reached.argmax(axis=-1), len(self.categories) - 2)
+
+
 class Configuration:
-    def __init__(self, config_path: str = "") -> None:
+    def __init__(self, config_path: str = "", overrides: Optional[dict] = None) -> None:
+        """Configuration of config_path. Given overrides (a nested dict, e.g.
+        {"compute": {"rating_factor": 1.5}}) replace values of the config files."""
         self.dict_cfg: Optional[OmegaConf] = None
+        self.rules: Optional[CompiledRules] = None
         self.start_valid_date: str = ""
         self.end_valid_date: str = ""
         self._config_path, basename = os.path.split(config_path)
         self._config_name, _ = os.path.splitext(basename)
+        self._overrides = overrides
+        self._base_cfg: Optional[OmegaConf] = None
+        self._defaults: Optional[Configuration] = None
 
         self._set_dates()
 
@@ -37,12 +144,36 @@ class Configuration:
         if self.dict_cfg is None:
             logger.debug("~ Config directory: '%s'", os.path.abspath(self._config_path))
 
-            base_cfg = self._load_base_config()
+            base_cfg = self._get_base_config()
+            if self._overrides:
+                base_cfg = OmegaConf.merge(base_cfg, self._overrides)
             tables_cfg = self._load_tables_config(base_cfg)
             self.dict_cfg = OmegaConf.merge(base_cfg, tables_cfg)
 
         return self.dict_cfg
 
+    def with_overrides(self, overrides: Optional[dict]) -> "Configuration":
+        """Return a new configuration with overrides, sharing the loaded config files."""
+        conf = Configuration(overrides=overrides)
+        conf.start_valid_date, conf.end_valid_date = self.start_valid_date, self.end_valid_date
+        conf._config_path, conf._config_name = self._config_path, self._config_name
+        conf._defaults = self
+        return conf
+
+    def _get_base_config(self) -> OmegaConf:
+        if self._defaults is not None:
+            return self._defaults._get_base_config()
+        if self._base_cfg is None:
+            self._base_cfg = self._load_base_config()
+        return self._base_cfg
+
+    def get_rules(self) -> CompiledRules:
+        """Compile numeric rule tables of the config, only the first time."""
+        if self.rules is None:
+            self.rules = CompiledRules.from_config(self.get_config())
+
+        return self.rules
+
     def _load_base_config(self) -> OmegaConf:
         config_dir = os.path.abspath(self._config_path)
         with hydra.initialize_config_dir(
@@ -94,7 +225,9 @@ class Configuration:
 
 class ConfigManager:
     _current_config = None
+    _current_rules = None
     _available_configs: List[Configuration] = []
+    _default_configs: List[Configuration] = []
 
     def __init__(self) -> None:
         pass
@@ -108,18 +241,44 @@ class ConfigManager:
         for path in sorted(AVAILABLE_CONFIGS, reverse=True):
             ConfigManager._available_configs.append(Configuration(path))
             logger.debug("~ Available %s", ConfigManager._available_configs[-1])
+        ConfigManager._default_configs = ConfigManager._available_configs
 
-    def get_valid_config(self, date: str) -> OmegaConf:
+    def set_overrides(self, overrides: Optional[dict]) -> None:
+        """Apply overrides to all available configs, None restores the config files values.
+
+        Current config is not modified until set_current_config is called.
+        """
+        self.initialize()
+        # Config files are loaded once, overridden configs share them
+        if overrides:
+            ConfigManager._available_configs = [
+                conf.with_overrides(overrides) for conf in ConfigManager._default_configs
+            ]
+        else:
+            ConfigManager._available_configs = ConfigManager._default_configs
+
+    def get_valid_configuration(self, date: str) -> Optional[Configuration]:
         self.initialize()
         for conf in ConfigManager._available_configs:
             if conf.start_valid_date <= date <= conf.end_valid_date:
-                return conf.get_config()
+                return conf
+
+    def get_valid_config(self, date: str) -> OmegaConf:
+        conf = self.get_valid_configuration(date)
+        if conf is not None:
+            return conf.get_config()
 
     @property
     def current_config(self) -> OmegaConf:
         return ConfigManager._current_config
 
+    @property
+    def current_rules(self) -> CompiledRules:
+        return ConfigManager._current_rules
+
     def set_current_config(self, date: str) -> None:
-        ConfigManager._current_config = self.get_valid_config(date)
-        if not os.path.exists(ConfigManager._current_config.io.data_folder):
-            os.mkdir(ConfigManager._current_config.io.data_folder)
+        conf = self.get_valid_configuration(date)
+        ConfigManager._current_config = conf.get_config()
+        ConfigManager._current_rules = conf.get_rules()
+        # Parallel rebuilds of several seasons might create it at the same time
+        os.makedirs(ConfigManager._current_config.io.data_folder, exist_ok=True)
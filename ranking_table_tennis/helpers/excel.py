@@ -5,7 +5,7 @@ from typing import List
 import pandas as pd
 from unidecode import unidecode
 
-from ranking_table_tennis import models
+from ranking_table_tennis import models, normalize
 from ranking_table_tennis.configs import ConfigManager
 from ranking_table_tennis.helpers.gspread import upload_sheet_from_df
 
@@ -105,7 +105,11 @@ def load_tournaments_sheets() -> models.Tournaments:
         to_concat.append(tournament_df)
 
     tournaments_df = pd.concat(to_concat, ignore_index=True)
+    # Canonical names of previous runs are reused
+    names_cache_filename = os.path.join(cfg.io.data_folder, cfg.io.pickle.names_cache)
+    normalize.names_cache.load(names_cache_filename)
     tournaments = models.Tournaments(tournaments_df)
+    normalize.names_cache.save(names_cache_filename)
 
     return tournaments
 
@@ -79,7 +79,7 @@ def fill_rating_column(
 
     cfg = ConfigManager().current_config
     tids = [cfg.initial_metadata.initial_tid] + [t for t in tournaments]  # to use prev_tid
-    prev_tid = tids[tids.index(tid) - 1]
+    prev_tid = tids[tournaments.get_ordinal(tid) - 1]
 
     # First try to use known previous ranking
     try:
@@ -369,7 +369,8 @@ def publish_histories_sheet(
     xlsx_filename = cfg.io.data_folder + cfg.io.xlsx.publish_filename.replace("NN", tid)
     sheet_name = cfg.sheetname.histories
 
-    tids_to_consider = players.history_df.tid <= tid
+    max_ordinal = tournaments.get_ordinal(tid)
+    tids_to_consider = tournaments.get_ordinals(players.history_df.tid) <= max_ordinal
     history_df = players.history_df.loc[tids_to_consider].copy()
 
     # Match pid to get player's metadata into new columns of history_df
@@ -592,7 +593,7 @@ def _insert_empty_row_between_categories(df: pd.DataFrame) -> pd.DataFrame:
     """Insert empty row between categories in the dataframe"""
     # First row is ommited because is an empty row
     return (
-        df.groupby("category", sort=False, as_index=False)[df.columns]
+        df.groupby("category", sort=False, as_index=False, observed=True)[df.columns]
         .apply(_insert_empty_row)
         .iloc[1:]
     )
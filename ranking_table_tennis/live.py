@@ -0,0 +1,389 @@
+import contextlib
+import csv
+import logging
+import sys
+import time
+from datetime import date, datetime, timezone
+from typing import Dict, Iterator, List, Set, TextIO, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ranking_table_tennis import helpers, models, normalize
+from ranking_table_tennis.configs import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# Columns of each match row, as in the matches of the tournaments sheet
+MATCH_COLUMNS = ["player_a", "player_b", "sets_a", "sets_b", "round", "category"]
+
+
+def parse_match(line: str) -> dict | None:
+    """Return the match of a csv line with MATCH_COLUMNS, e.g.
+
+    Juan Perez,Pedro Gomez,3,1,final,primera
+
+    None for empty lines and the header. Raise ValueError if the line is not a valid match.
+    """
+    values = next(csv.reader([line]), [])
+    if not values or values[0].strip() == MATCH_COLUMNS[0]:
+        return None
+    if len(values) != len(MATCH_COLUMNS):
+        raise ValueError(f"Expected {len(MATCH_COLUMNS)} values: {MATCH_COLUMNS}, got '{line}'")
+
+    match = dict(zip(MATCH_COLUMNS, values))
+    return {
+        "player_a": normalize.canonical_name(match["player_a"]),
+        "player_b": normalize.canonical_name(match["player_b"]),
+        "sets_a": int(match["sets_a"]),
+        "sets_b": int(match["sets_b"]),
+        "round": match["round"].strip().lower(),
+        "category": match["category"].strip().lower(),
+    }
+
+
+def process_match(match: dict, cfg) -> dict:
+    """Return match with winner, loser, their rounds, and the kind of match, with the same
+    rules as Tournaments._batch_process_matches."""
+    sets_a, sets_b = match["sets_a"], match["sets_b"]
+    promote = sets_a >= 10 and sets_b >= 10
+    sanction = sets_a <= -10 and sets_b <= -10
+    bonus = sets_a < 0 and sets_b < 0 and not sanction
+
+    # Workaround to add extra bonus points, or to promote or sanction player b
+    winner, loser = match["player_b"], match["player_b"]
+    if not (promote or sanction or bonus):
+        if sets_a == sets_b:
+            raise ValueError(f"Unexpected tie: {match}")
+        if sets_a > sets_b:
+            winner, loser = match["player_a"], match["player_b"]
+        else:
+            winner, loser = match["player_b"], match["player_a"]
+
+    winner_round, loser_round = match["round"], match["round"]
+    if match["round"] == cfg.roundnames.final:
+        winner_round, loser_round = cfg.roundnames.champion, cfg.roundnames.second
+    elif match["round"] == cfg.roundnames.third_place_playoff:
+        winner_round, loser_round = cfg.roundnames.third, cfg.roundnames.fourth
+
+    return {
+        **match,
+        "winner": winner,
+        "winner_round": winner_round,
+        "loser": loser,
+        "loser_round": loser_round,
+        "promote": promote,
+        "sanction": sanction,
+        "bonus": bonus,
+    }
+
+
+class LiveTournament:
+    """Provisional ranking of a tournament being played, updated match by match.
+
+    Ratings and category points follow the rules of Rankings.compute_new_ratings and
+    Rankings.compute_category_points: ratings of matches are based on the ranking of the
+    previous tournament, so a new match only changes its players, and the rivals of a player
+    that turns out to play its own category (or not). Standings are kept in dicts, they are
+    only turned into a DataFrame when asked.
+
+    Provisional categories are the ones of the config valid at tournament_date (YYMMDD), as
+    rankings are categorized after computing a tournament. Current config if not given.
+    """
+
+    def __init__(
+        self,
+        rankings: models.Rankings,
+        players: models.Players,
+        prev_tid: str,
+        tournament_date: str | None = None,
+    ) -> None:
+        self.cfg = ConfigManager().current_config
+        self.rules = ConfigManager().current_rules
+        tournament_conf = (
+            ConfigManager().get_valid_configuration(tournament_date) if tournament_date else None
+        )
+        self.categories_rules = (
+            self.rules if tournament_conf is None else tournament_conf.get_rules()
+        )
+        self.points_cat_columns = rankings.points_cat_columns()
+
+        prev_ranking = rankings[prev_tid]
+        pids = prev_ranking["pid"].tolist()
+        ratings = prev_ranking["rating"].to_numpy(dtype=float)
+        self._name2pid: Dict[str, int] = players.get_name2pid().to_dict()
+        self._pid2name: Dict[int, str] = players.pid2name_mapper.to_dict()
+        self._prev_rating: Dict[int, float] = dict(zip(pids, ratings.tolist()))
+        self._prev_category: Dict[int, str] = dict(zip(pids, prev_ranking["category"].tolist()))
+        # Own categories are the ones of the ratings of the previous tournament
+        category_names = np.array(self.rules.categories, dtype=object)
+        own_categories = category_names[self.rules.rating_category_codes(ratings)]
+        self._own_category: Dict[int, str] = dict(zip(pids, own_categories.tolist()))
+
+        self._participants: Set[int] = set()
+        self._played_categories: Dict[int, Set[str]] = {}
+        self._not_own_category: Dict[int, bool] = {}
+        self._best_rounds: Dict[Tuple[int, str], str] = {}
+        self._sanctions: Dict[int, int] = {}
+        # Rated matches, and positions of the ones won and lost by each player
+        self._matches: List[dict] = []
+        self._won: Dict[int, List[int]] = {}
+        self._lost: Dict[int, List[int]] = {}
+        self.n_matches = 0
+
+    def add_match(self, match: dict) -> List[int]:
+        """Update the provisional ranking with match (see parse_match).
+
+        Returns pids of the ranking whose rating or points changed.
+        """
+        match = process_match(match, self.cfg)
+        self.n_matches += 1
+        winner_pid = self._get_pid(match["winner"])
+        loser_pid = self._get_pid(match["loser"])
+        known_pids = [pid for pid in dict.fromkeys([winner_pid, loser_pid]) if pid is not None]
+        self._participants.update(known_pids)
+
+        if match["sanction"]:
+            if loser_pid is not None:
+                self._sanctions[loser_pid] = self._sanctions.get(loser_pid, 0) + 1
+        elif not match["promote"]:
+            # Promotions have no effect, categories are based on ratings
+            self._add_best_round(winner_pid, match["category"], match["winner_round"])
+            self._add_best_round(loser_pid, match["category"], match["loser_round"])
+
+        changed = set(known_pids)
+        if (
+            not (match["sanction"] or match["promote"] or match["bonus"])
+            and match["category"] != self.cfg.categories[-1]
+            and winner_pid in self._prev_rating
+            and loser_pid in self._prev_rating
+        ):
+            self._add_rated_match(winner_pid, loser_pid)
+
+        # Rivals of players that switched between own and not own category are rated again
+        for pid in known_pids:
+            not_own_category = self._is_not_own_category(pid)
+            if self._not_own_category.get(pid, False) != not_own_category:
+                self._not_own_category[pid] = not_own_category
+                changed.update(self._rate_matches_of(pid))
+
+        return sorted(pid for pid in changed if pid in self._prev_rating)
+
+    def _get_pid(self, name: str) -> int | None:
+        pid = self._name2pid.get(name)
+        if pid is None:
+            logger.warning("Unknown player '%s', matches are not rated", name)
+        return pid
+
+    def _add_best_round(self, pid: int | None, category: str, round_reached: str) -> None:
+        """Keep the round of the highest priority of each player and category."""
+        if pid is None:
+            return
+        self._played_categories.setdefault(pid, set()).add(category)
+        best_round = self._best_rounds.get((pid, category))
+        if best_round is None or self._round_priority(round_reached) > self._round_priority(
+            best_round
+        ):
+            self._best_rounds[(pid, category)] = round_reached
+
+    def _round_priority(self, round_reached: str) -> float:
+        """Priority of a round, unknown rounds have no priority."""
+        round_code = self.rules.round_codes([round_reached])[0]
+        return self.rules.round_priority[round_code] if round_code >= 0 else -np.inf
+
+    def _is_not_own_category(self, pid: int) -> bool:
+        """Same as Rankings.get_not_own_category_mask, players of fan category are excluded."""
+        own_category = self._own_category.get(pid)
+        return (
+            pid in self._participants
+            and own_category not in self._played_categories.get(pid, set())
+            and own_category != self.cfg.categories[-1]
+        )
+
+    def _add_rated_match(self, winner_pid: int, loser_pid: int) -> None:
+        rating_diff = self._prev_rating[winner_pid] - self._prev_rating[loser_pid]
+        to_winner, to_loser = self.rules.points_to_assign(np.array([rating_diff]))
+        self._matches.append(
+            {
+                "winner_pid": winner_pid,
+                "loser_pid": loser_pid,
+                "rating_diff": rating_diff,
+                "to_winner": to_winner[0],
+                "to_loser": to_loser[0],
+            }
+        )
+        match_num = len(self._matches) - 1
+        self._won.setdefault(winner_pid, []).append(match_num)
+        self._lost.setdefault(loser_pid, []).append(match_num)
+        self._rate_match(self._matches[-1])
+
+    def _rate_matches_of(self, pid: int) -> Set[int]:
+        """Rate again matches of pid, returns their players."""
+        players = set()
+        for match_num in self._won.get(pid, []) + self._lost.get(pid, []):
+            match = self._matches[match_num]
+            self._rate_match(match)
+            players.update((match["winner_pid"], match["loser_pid"]))
+        return players
+
+    def _rate_match(self, match: dict) -> None:
+        """Same factors as Rankings._batch_get_factor, for a single match."""
+        winner_pid, loser_pid = match["winner_pid"], match["loser_pid"]
+        not_own_category = self._not_own_category.get(winner_pid, False)
+        not_own_category |= self._not_own_category.get(loser_pid, False)
+        category_factor = 1.0
+        if self._prev_category[winner_pid] != self._prev_category[loser_pid] and not (
+            not_own_category
+        ):
+            if match["rating_diff"] < 0:
+                category_factor = self.rules.category_unexpected_factor
+            else:
+                category_factor = self.rules.category_expected_factor
+        factor = self.rules.rating_factor * category_factor
+        match["rating_to_winner"] = factor * match["to_winner"]
+        match["rating_to_loser"] = -(factor * match["to_loser"])
+
+    def rating(self, pid: int) -> float:
+        """Provisional rating of pid. Changes are summed up as in compute_new_ratings, won
+        matches first."""
+        won, lost = self._won.get(pid, []), self._lost.get(pid, [])
+        if not won and not lost:
+            return self._prev_rating[pid]
+        changes = 0.0
+        for match_num in won:
+            changes += self._matches[match_num]["rating_to_winner"]
+        for match_num in lost:
+            changes += self._matches[match_num]["rating_to_loser"]
+        return self._prev_rating[pid] + changes
+
+    def category_points(self, pid: int) -> List[float]:
+        """Provisional points of pid in each category, sanctions included."""
+        points = [0.0] * len(self.rules.categories)
+        for category_code, category in enumerate(self.rules.categories):
+            best_round = self._best_rounds.get((pid, category))
+            round_code = -1 if best_round is None else self.rules.round_codes([best_round])[0]
+            if round_code >= 0:
+                points[category_code] = float(
+                    self.rules.best_rounds_points[category_code, round_code]
+                )
+        for _ in range(self._sanctions.get(pid, 0)):
+            points = [cat_points * self.rules.sanction_factor for cat_points in points]
+        return points
+
+    def category(self, pid: int) -> str:
+        rules = self.categories_rules
+        return rules.categories[rules.rating_category_codes(self.rating(pid))]
+
+    def player_summary(self, pid: int) -> str:
+        rating = self.rating(pid)
+        points = {
+            category: cat_points
+            for category, cat_points in zip(self.rules.categories, self.category_points(pid))
+            if cat_points
+        }
+        return (
+            f"{self._pid2name.get(pid, pid)}: rating {rating:.1f} "
+            f"({rating - self._prev_rating[pid]:+.1f}), {self.category(pid)}, points {points}"
+        )
+
+    def standings(self) -> pd.DataFrame:
+        """Provisional ranking of all players, sorted by rating descending and pid ascending."""
+        pids = list(self._prev_rating)
+        ratings = [self.rating(pid) for pid in pids]
+        standings = pd.DataFrame(
+            {
+                "pid": pids,
+                "name": [self._pid2name.get(pid) for pid in pids],
+                "rating": ratings,
+                "rating_change": np.subtract(ratings, list(self._prev_rating.values())),
+                "category": [self.category(pid) for pid in pids],
+            }
+        )
+        points = pd.DataFrame(
+            [self.category_points(pid) for pid in pids], columns=self.points_cat_columns
+        )
+
+        return pd.concat([standings, points], axis="columns").sort_values(
+            ["rating", "pid"], ascending=[False, True], ignore_index=True
+        )
+
+
+def _read_lines(stream: TextIO, follow: bool, poll_interval: float = 0.5) -> Iterator[str]:
+    """Lines of stream, waiting for new ones at the end if follow=True."""
+    while True:
+        line = stream.readline()
+        if line:
+            yield line
+        elif follow:
+            time.sleep(poll_interval)
+        else:
+            return
+
+
+def main(
+    matches_filename: str = "-",
+    config_initial_date: str = "220101",
+    follow: bool = False,
+    tournament_date: str | None = None,
+    today: date | None = None,
+) -> LiveTournament:
+    """Update the provisional ranking of the tournament being played with each match read
+    from matches_filename ("-" for stdin), one csv line per match (see parse_match).
+
+    Function to run after compute_rankings.main(), it will read players, tournaments and
+    rankings in pickles. Ratings are based on the last computed ranking. Categories are
+    based on the config valid at tournament_date (YYMMDD), today by default (the current
+    date, unless today is given).
+
+    If follow=True, it waits for matches appended to the file until interrupted.
+    Final provisional standings are logged and returned with the live tournament.
+    """
+    logger.info("Starting live tournament!")
+
+    ConfigManager().set_current_config(date=config_initial_date)
+    cfg = ConfigManager().current_config
+
+    tournaments = helpers.load_from_pickle(cfg.io.pickle.tournaments)
+    players = helpers.load_from_pickle(cfg.io.pickle.players)
+    rankings = helpers.load_from_pickle(cfg.io.pickle.rankings)
+
+    # Config is left as it was after computing the last tournament
+    prev_tid = max(rankings.get_tids(), key=tournaments.get_ordinal)
+    if prev_tid != cfg.initial_metadata.initial_tid:
+        prev_date = tournaments[prev_tid].iloc[0].date.strftime("%y%m%d")
+        ConfigManager().set_current_config(date=prev_date)
+        rankings.update_config()
+    if tournament_date is None:
+        tournament_date = (today or datetime.now(timezone.utc).astimezone().date()).strftime(
+            "%y%m%d"
+        )
+    live = LiveTournament(rankings, players, prev_tid, tournament_date)
+    logger.info("Provisional ratings based on ranking of %s", prev_tid)
+
+    with (
+        contextlib.nullcontext(sys.stdin)
+        if matches_filename == "-"
+        else open(matches_filename, encoding="utf-8")
+    ) as stream:
+        try:
+            for line in _read_lines(stream, follow):
+                try:
+                    match = parse_match(line)
+                    if match is None:
+                        continue
+                    changed_pids = live.add_match(match)
+                except ValueError as err:
+                    logger.warning("Skipping match: %s", err)
+                    continue
+                for pid in changed_pids:
+                    logger.info(live.player_summary(pid))
+        except KeyboardInterrupt:
+            logger.info("Live tournament interrupted")
+
+    logger.info("Provisional standings after %d matches:\n%s", live.n_matches, live.standings())
+
+    return live
+
+
+if __name__ == "__main__":
+    main()
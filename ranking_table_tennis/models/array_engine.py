@@ -0,0 +1,354 @@
+import logging
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ranking_table_tennis.configs import ConfigManager
+from ranking_table_tennis.models.players import Players
+from ranking_table_tennis.models.rankings import Rankings
+from ranking_table_tennis.models.schema import PARTICIPATIONS_DTYPE
+from ranking_table_tennis.models.tournaments import Tournaments
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _TidInputs:
+    """Inputs of a tournament read from tournaments, with pids as positions of the state."""
+
+    matches: pd.DataFrame
+    winners: np.ndarray
+    losers: np.ndarray
+    participants: np.ndarray
+    best_rounds: pd.DataFrame
+    best_rounds_players: np.ndarray
+    best_rounds_categories: np.ndarray
+    best_rounds_rounds: np.ndarray
+    sanctioned: np.ndarray
+
+
+@dataclass
+class _TidState:
+    """State of players after computing a tournament, to build its ranking."""
+
+    rating: np.ndarray
+    category: np.ndarray
+    active: np.ndarray
+    n_tournaments: int
+
+
+class ArrayEngine:
+    """Compute rankings with the state of players in arrays, instead of a DataFrame per tid.
+
+    Ratings, categories, activity and championship points of players are arrays indexed by
+    the position of each pid in the last computed ranking (its players are the ones of all
+    the following rankings). Tournaments are read, and rankings and details are built, with
+    pandas only before and after advancing the state. Results are the same as the ones of
+    compute_rankings.compute_tournaments.
+    """
+
+    def __init__(
+        self, tournaments: Tournaments, players: Players, rankings: Rankings, tids: List[str]
+    ) -> None:
+        """tids are all tids in order, starting with the initial one."""
+        self.tournaments = tournaments
+        self.players = players
+        self.rankings = rankings
+        self.tids = tids
+        # Position of each tid in tids
+        self._tid_positions = {tid: num for num, tid in enumerate(tids)}
+        self.update_config()
+
+    def update_config(self) -> None:
+        self.cfg = ConfigManager().current_config
+        self.rules = ConfigManager().current_rules
+        self.rankings.update_config()
+
+    def _load_state(self, prev_tid: str) -> None:
+        """Load the state of players from the ranking of prev_tid and the previous ones."""
+        prev_ranking = self.rankings[prev_tid]
+        self._categories = self.rules.categories
+        self._pids = prev_ranking["pid"].to_numpy()
+        self._pid_index = pd.Index(self._pids)
+        self._metadata = prev_ranking.loc[:, ["tournament_name", "date", "location"]]
+        self._columns = list(prev_ranking.columns)
+
+        self.rating = prev_ranking["rating"].to_numpy(dtype=float).copy()
+        self.category = self._category_codes(prev_ranking["category"])
+        self.active = prev_ranking["active"].to_numpy(dtype=bool).copy()
+
+        initial_ranking = self.rankings[self.tids[0]]
+        initial_active_pids = initial_ranking.loc[initial_ranking.active, "pid"].unique()
+        self._initial_active = np.isin(self._pids, initial_active_pids)
+
+        # Points of each computed tid (but the initial one), a players x categories matrix
+        computed_tids = self.tids[1 : self._tid_positions[prev_tid] + 1]
+        self._points_tids = list(computed_tids)
+        self._points_positions = {tid: num for num, tid in enumerate(computed_tids)}
+        self._points = [
+            prev_ranking.loc[:, ["pid"]]
+            .merge(self.rankings[tid], on="pid", how="left")
+            .loc[:, self.rankings.points_cat_columns()]
+            .fillna(0.0)
+            .to_numpy(dtype=float)
+            for tid in computed_tids
+        ]
+
+    def _category_codes(self, categories: pd.Series) -> np.ndarray:
+        codes = self.rules.category_codes(categories)
+        if (codes < 0).any():
+            raise ValueError(f"Unknown categories: {sorted(set(categories[codes < 0]))}")
+        return codes
+
+    def _positions(self, pids) -> np.ndarray:
+        """Position of each pid in the state, -1 for unknown pids."""
+        return self._pid_index.get_indexer(pd.Index(pids))
+
+    def _read_inputs(self, tid: str) -> _TidInputs:
+        tournament_df = self.tournaments[tid]
+        sanctioned = self._positions(tournament_df.loc[tournament_df.sanction, "loser_pid"])
+
+        # Matches of players unknown to rankings are not computed
+        matches = self.tournaments.get_matches(tid)
+        winners = self._positions(matches["winner_pid"])
+        losers = self._positions(matches["loser_pid"])
+        known = (winners >= 0) & (losers >= 0)
+
+        best_rounds = self.tournaments.compute_best_rounds(tid)
+
+        return _TidInputs(
+            matches=matches.loc[known],
+            winners=winners[known],
+            losers=losers[known],
+            participants=self._positions(self.tournaments.get_players_pids(tid)),
+            best_rounds=best_rounds,
+            best_rounds_players=self._positions(best_rounds["pid"]),
+            best_rounds_categories=self.rules.category_codes(best_rounds["category"]),
+            best_rounds_rounds=self.rules.round_codes(best_rounds["best_round"]),
+            sanctioned=sanctioned[sanctioned >= 0],
+        )
+
+    def _not_own_category(self, inputs: _TidInputs, category: np.ndarray) -> np.ndarray:
+        """True for participants that didn't play their own category, but the fan category."""
+        n_players = len(self._pids)
+        played = inputs.best_rounds_players >= 0
+        played_categories = np.zeros((n_players, len(self._categories) + 1), dtype=bool)
+        # Unknown categories are marked in the last column, they are nobody's own category
+        played_categories[
+            inputs.best_rounds_players[played], inputs.best_rounds_categories[played]
+        ] = True
+
+        participant = np.zeros(n_players, dtype=bool)
+        participant[inputs.participants[inputs.participants >= 0]] = True
+        fan_category = len(self._categories) - 1
+
+        return (
+            participant
+            & ~played_categories[np.arange(n_players), category]
+            & (category != fan_category)
+        )
+
+    def _compute_ratings(self, inputs: _TidInputs, not_own_category: np.ndarray) -> pd.DataFrame:
+        """Update ratings with the matches of a tournament and return their details."""
+        winners, losers = inputs.winners, inputs.losers
+        rating_diff = self.rating[winners] - self.rating[losers]
+        to_winner, to_loser = self.rules.points_to_assign(rating_diff)
+
+        match_not_own_category = not_own_category[winners] | not_own_category[losers]
+        category_factor = np.where(
+            (self.category[winners] != self.category[losers]) & ~match_not_own_category,
+            np.where(
+                rating_diff < 0,
+                self.rules.category_unexpected_factor,
+                self.rules.category_expected_factor,
+            ),
+            1.0,
+        )
+        factor = self.rules.rating_factor * category_factor
+        rating_to_winner = factor * to_winner
+        rating_to_loser = -(factor * to_loser)
+
+        category_names = np.array(self._categories, dtype=object)
+        details = inputs.matches.assign(
+            rating_to_winner=rating_to_winner,
+            rating_to_loser=rating_to_loser,
+            winner_category=category_names[self.category[winners]],
+            winner_rating=self.rating[winners],
+            loser_category=category_names[self.category[losers]],
+            loser_rating=self.rating[losers],
+            not_own_category=match_not_own_category,
+            factor=factor,
+        )
+
+        # Changes of each player are summed up in the order of matches
+        played = np.concatenate([winners, losers])
+        rating_changes = np.bincount(
+            played,
+            weights=np.concatenate([rating_to_winner, rating_to_loser]),
+            minlength=len(self.rating),
+        )
+        played = np.unique(played)
+        self.rating[played] = self.rating[played] + rating_changes[played]
+
+        return details
+
+    def _category_points(self, inputs: _TidInputs) -> np.ndarray:
+        """Points of each player and category assigned by best rounds of a tournament."""
+        points = np.zeros((len(self._pids), len(self._categories)), dtype=float)
+        known = (
+            (inputs.best_rounds_players >= 0)
+            & (inputs.best_rounds_categories >= 0)
+            & (inputs.best_rounds_rounds >= 0)
+        )
+        categories = inputs.best_rounds_categories[known]
+        points[inputs.best_rounds_players[known], categories] = self.rules.best_rounds_points[
+            categories, inputs.best_rounds_rounds[known]
+        ]
+
+        return points
+
+    def _update_active_players(self, tid: str) -> None:
+        activate_window = self.cfg.compute.tournament_window_to_activate
+        inactivate_window = self.cfg.compute.tournament_window_to_inactivate
+        tourns_to_activate = self.cfg.compute.tournaments_to_activate
+
+        tid_position = self._tid_positions[tid]
+        active_window_tids = self.tids[
+            max(0, tid_position - activate_window + 1) : tid_position + 1
+        ]
+        inactive_window_tids = self.tids[
+            max(0, tid_position - inactivate_window + 1) : tid_position + 1
+        ]
+
+        pids = self._pids.tolist()
+        played_to_activate = self.players.participation_matrix(pids, active_window_tids).sum(axis=1)
+        keep_initial_active = (tid_position + 1 < inactivate_window) & self._initial_active
+        played_to_keep_active = self.players.participation_matrix(pids, inactive_window_tids).any(
+            axis=1
+        )
+
+        self.active = np.where(
+            self.active,
+            keep_initial_active | played_to_keep_active,
+            played_to_activate >= tourns_to_activate,
+        )
+
+    def _check_categories(self) -> None:
+        if self.rules.categories != self._categories:
+            raise ValueError(
+                f"Categories changed from {self._categories} to {self.rules.categories}, "
+                "rankings must be computed with the pandas engine"
+            )
+
+    def compute(self, tids_to_compute: List[str]) -> None:
+        """Compute rankings of tids_to_compute and add them, with their details, to rankings.
+        Histories of players are updated.
+
+        Rankings of the tids before the ones to compute must be available. Config is left as
+        it was for the last tid.
+        """
+        if not tids_to_compute:
+            return
+
+        self._load_state(self.tids[self._tid_positions[tids_to_compute[0]] - 1])
+        states: Dict[str, _TidState] = {}
+        rating_details = []
+        championship_details = []
+        for tid in tids_to_compute:
+            logger.info("** Computing %s", tid)
+            self._check_categories()
+            inputs = self._read_inputs(tid)
+            self.players.update_histories(tid, inputs.best_rounds)
+
+            # Players that didn't play their own category, with categories of current config
+            not_own_category = self._not_own_category(
+                inputs, self.rules.rating_category_codes(self.rating)
+            )
+            rating_details.append(self._compute_ratings(inputs, not_own_category))
+            # Promotions have no effect, categories are based on ratings
+            self.category = self.rules.rating_category_codes(self.rating)
+
+            points = self._category_points(inputs)
+            championship_details.append(
+                self.rankings.points_of_best_rounds(tid, inputs.best_rounds)
+            )
+            self._update_active_players(tid)
+            # Substract championship points
+            np.multiply.at(points, inputs.sanctioned, self.rules.sanction_factor)
+            self._points.append(points)
+            self._points_positions[tid] = len(self._points_tids)
+            self._points_tids.append(tid)
+            n_tournaments = self.cfg.compute.masters_N_tournaments_to_consider
+
+            # Update categories based on updated config. Computation performed based on old config
+            tournament_date = self.tournaments[tid].iloc[0].date.strftime("%y%m%d")
+            ConfigManager().set_current_config(date=tournament_date)
+            self.update_config()
+            self.category = self.rules.rating_category_codes(self.rating)
+
+            states[tid] = _TidState(
+                rating=self.rating.copy(),
+                category=self.category,
+                active=self.active,
+                n_tournaments=n_tournaments,
+            )
+
+        ranking_df = pd.concat(
+            [self._build_ranking(tid, state) for tid, state in states.items()], ignore_index=True
+        )
+        self.rankings.add_computed_rankings(
+            ranking_df, pd.concat(rating_details), pd.concat(championship_details)
+        )
+
+    def _build_ranking(self, tid: str, state: _TidState) -> pd.DataFrame:
+        """Ranking of tid with the state of players, as initialized from the previous one."""
+        ranking = pd.DataFrame(
+            {
+                "tid": tid,
+                **{col: self._metadata[col].to_numpy() for col in self._metadata.columns},
+                "pid": self._pids,
+                "rating": state.rating,
+                "category": np.array(self._categories, dtype=object)[state.category],
+                "active": state.active,
+            }
+        )
+
+        # Championship points are the best n_tournaments points of each player up to tid
+        n_computed = self._points_positions[tid] + 1
+        tids = np.array(self._points_tids[:n_computed], dtype=object)
+        points = np.stack(self._points[:n_computed], axis=-1)
+        cat_values = {}
+        for cat_num, (points_col, cum_points_col, participations_col, cum_tids_col) in enumerate(
+            zip(
+                self.rankings.points_cat_columns(),
+                self.rankings.cum_points_cat_columns(),
+                self.rankings.participations_cat_columns(),
+                self.rankings.cum_tids_cat_columns(),
+            )
+        ):
+            cat_points = points[:, cat_num, :]
+            with_points = cat_points > 0
+            # Sorted by points and tid descending, tournaments without points are the last ones
+            order = np.lexsort(
+                (np.broadcast_to(-np.arange(n_computed), cat_points.shape), -cat_points), axis=-1
+            )[:, : state.n_tournaments]
+            best_points = np.take_along_axis(cat_points, order, axis=-1)
+            best = np.take_along_axis(with_points, order, axis=-1)
+
+            cum_tids = np.full(len(self._pids), "", dtype=object)
+            for row in np.flatnonzero(with_points.any(axis=1)):
+                cum_tids[row] = " + ".join(
+                    f"{int(tid_points)} ({best_tid})"
+                    for tid_points, best_tid in zip(
+                        best_points[row, best[row]], tids[order[row, best[row]]]
+                    )
+                )
+
+            cat_values[points_col] = cat_points[:, -1]
+            cat_values[cum_points_col] = np.where(best, best_points, 0.0).sum(axis=1)
+            cat_values[participations_col] = with_points.sum(axis=1).astype(PARTICIPATIONS_DTYPE)
+            cat_values[cum_tids_col] = cum_tids
+
+        return ranking.assign(**cat_values).loc[:, self._columns]
@@ -1,8 +1,12 @@
+import hashlib
 import logging
-from typing import List
+from typing import Dict, List
 
+import numpy as np
 import pandas as pd
-from unidecode import unidecode
+
+from ranking_table_tennis import normalize
+from ranking_table_tennis.models.schema import HISTORY_SCHEMA, apply_schema
 
 logger = logging.getLogger(__name__)
 
@@ -13,15 +17,34 @@ class Players:
         Create a players database from given players DataFrame
         :param players_df: DataFrame with columns: pid, name, affiliation, city, and history
         """
-        self.players_df = pd.DataFrame(players_df, columns=["pid", "name", "affiliation", "city"])
-        self.players_df.set_index("pid", drop=True, verify_integrity=True, inplace=True)
+        players_df = pd.DataFrame(players_df, columns=["pid", "name", "affiliation", "city"])
+        players_df.set_index("pid", drop=True, verify_integrity=True, inplace=True)
+        self._players_df = players_df
 
         self.history_df = pd.DataFrame(history_df, columns=["tid", "pid", "category", "best_round"])
+        if not self.history_df.empty:
+            self.history_df = apply_schema(self.history_df, HISTORY_SCHEMA)
+        self._build_participations()
 
         self.verify_and_normalize()
 
+    def __getstate__(self) -> dict:
+        self.commit()
+        return self.__dict__.copy()
+
+    def __setstate__(self, state: dict) -> None:
+        if "players_df" in state:
+            # Players pickled before normalization was deferred
+            state["_players_df"] = state.pop("players_df")
+        self.__dict__.update(state)
+        self.__dict__.setdefault("_pids", set(self._players_df.index))
+        self.__dict__.setdefault("_dirty_pids", set())
+        self.__dict__.setdefault("_names_version", None)
+        if "_participations" not in state:
+            self._build_participations()
+
     def __len__(self) -> int:
-        return len(self.players_df)
+        return len(self._players_df)
 
     def __str__(self) -> str:
         return str(self.players_df)
@@ -29,30 +52,70 @@ class Players:
     def __getitem__(self, pid: int) -> pd.Series:
         return self.players_df.loc[pid]
 
+    @property
+    def players_df(self) -> pd.DataFrame:
+        """Players indexed by pid. Players added since last commit are normalized first."""
+        self.commit()
+        return self._players_df
+
     def verify_and_normalize(self) -> None:
-        duplicated = self.players_df.index.duplicated(keep=False)
+        """Verify and normalize all players."""
+        duplicated = self._players_df.index.duplicated(keep=False)
         if duplicated.any():
-            logger.error("Players entries duplicated:\n%s", self.players_df[duplicated])
+            logger.error("Players entries duplicated:\n%s", self._players_df[duplicated])
+        self._pids = set(self._players_df.index)
+        self._names_version: str | None = None
 
-        self.players_df.fillna("", inplace=True)
+        self._dirty_pids = set(self._pids)
+        self.commit()
 
-        # cols_to_upper = ["affiliation"]
-        # self.players_df.loc[:, cols_to_upper] = self.players_df.loc[:, cols_to_upper].map(
-        #     lambda cell: cell.strip().upper())
+    def commit(self) -> None:
+        """Normalize players added or modified since last commit."""
+        if not self._dirty_pids:
+            return
 
         cols_to_title = ["name", "city"]
-        self.players_df.loc[:, cols_to_title] = self.players_df.loc[:, cols_to_title].map(
-            lambda cell: unidecode(cell).strip().title()
-        )
+        if len(self._dirty_pids) == len(self._pids):
+            self._players_df.fillna("", inplace=True)
+
+            # cols_to_upper = ["affiliation"]
+            # self._players_df.loc[:, cols_to_upper] = self._players_df.loc[:, cols_to_upper].map(
+            #     lambda cell: cell.strip().upper())
+
+            for col in cols_to_title:
+                self._players_df[col] = normalize.normalize_names(self._players_df[col])
+        else:
+            dirty = self._players_df.index.isin(self._dirty_pids)
+            dirty_players = self._players_df.loc[dirty].astype(object).fillna("")
+            for col in cols_to_title:
+                dirty_players[col] = normalize.normalize_names(dirty_players[col])
+            self._players_df = self._players_df.astype(
+                {
+                    col: object
+                    for col in dirty_players.columns
+                    if self._players_df[col].dtype != object
+                }
+            )
+            self._players_df.loc[dirty] = dirty_players.to_numpy()
+        self._dirty_pids = set()
+        self._names_version = None
 
     def get_pid(self, name: str) -> int:
-        uname = unidecode(name).title()
+        uname = normalize.canonical_name(name)
         pid = self.players_df[self.players_df.name == uname].first_valid_index()
         if pid is None:
             logger.warn("WARNING: Unknown player: %s", uname)
 
         return pid
 
+    @property
+    def names_version(self) -> str:
+        """Hash of pids and names of players, it changes when players are added or renamed."""
+        if self._names_version is None:
+            hashed_names = pd.util.hash_pandas_object(self.players_df["name"], index=True)
+            self._names_version = hashlib.sha256(hashed_names.to_numpy().tobytes()).hexdigest()
+        return self._names_version
+
     def get_name2pid(self) -> pd.Series:
         name2pid = self.players_df.loc[:, "name"].copy()
         name2pid = name2pid.reset_index()
@@ -66,13 +129,23 @@ class Players:
         return self.players_df["name"]
 
     def add_player(self, player: pd.Series) -> None:
-        self.players_df = pd.concat([self.players_df, player], axis="index")
-        self.verify_and_normalize()
+        """Add a player entry (named by its pid). It is normalized on next read."""
+        self._add_pid(player.name)
+        player_df = player.to_frame().T.rename_axis(self._players_df.index.name)
+        self._players_df = pd.concat([self._players_df, player_df], axis="index")
 
     def add_new_player(self, name: str, affiliation: str = "", city: str = "") -> None:
-        pid = self.players_df.index.max() + 1
-        self.players_df.loc[pid] = {"name": name, "affiliation": affiliation, "city": city}
-        self.verify_and_normalize()
+        """Add a player with a new pid. It is normalized on next read."""
+        pid = self._players_df.index.max() + 1
+        self._add_pid(pid)
+        self._players_df.loc[pid] = {"name": name, "affiliation": affiliation, "city": city}
+
+    def _add_pid(self, pid: int) -> None:
+        if pid in self._pids:
+            logger.error("Players entries duplicated:\n%s", self._players_df.loc[[pid]])
+        self._pids.add(pid)
+        self._dirty_pids.add(pid)
+        self._names_version = None
 
     def update_histories(self, tid: str, best_rounds: pd.DataFrame) -> None:
         """Save player's best rounds into their histories.
@@ -81,11 +154,57 @@ class Players:
         """
         to_update = best_rounds.loc[:, ["pid", "category", "best_round"]]
         to_update.insert(0, "tid", tid)
+        # Empty histories are not concatenated, they would not keep the dtypes of best rounds
+        histories = [history for history in (self.history_df, to_update) if not history.empty]
         self.history_df = (
-            pd.concat([self.history_df, to_update])
+            pd.concat(histories or [to_update])
             .drop_duplicates(ignore_index=True)
             .infer_objects()
+            .pipe(apply_schema, HISTORY_SCHEMA)
         )
+        self._mark_participations(tid, to_update["pid"])
+
+    def _build_participations(self) -> None:
+        """Build the pid x tid participation matrix from histories."""
+        self._participations = np.zeros((0, 0), dtype=bool)
+        self._participations_rows: Dict[int, int] = {}
+        self._participations_cols: Dict[str, int] = {}
+        for tid, tid_history in self.history_df.groupby("tid", sort=True):
+            self._mark_participations(tid, tid_history["pid"])
+
+    def _mark_participations(self, tid: str, pids: pd.Series) -> None:
+        """Mark given pids as players of tid. Matrix capacity grows geometrically."""
+        col = self._participations_cols.setdefault(tid, len(self._participations_cols))
+        rows = [
+            self._participations_rows.setdefault(pid, len(self._participations_rows))
+            for pid in pids.dropna().tolist()
+        ]
+
+        n_rows, n_cols = self._participations.shape
+        if len(self._participations_rows) > n_rows or len(self._participations_cols) > n_cols:
+            grown = np.zeros(
+                (
+                    max(len(self._participations_rows), 2 * n_rows),
+                    max(len(self._participations_cols), 2 * n_cols),
+                ),
+                dtype=bool,
+            )
+            grown[:n_rows, :n_cols] = self._participations
+            self._participations = grown
+
+        self._participations[rows, col] = True
+
+    def participation_matrix(self, pids: List[int], tids: List[str]) -> np.ndarray:
+        """Return a boolean matrix (pids x tids) that indicates who played each tournament."""
+        rows = np.array([self._participations_rows.get(pid, -1) for pid in pids], dtype=np.intp)
+        cols = np.array([self._participations_cols.get(tid, -1) for tid in tids], dtype=np.intp)
+        matrix = np.zeros((len(rows), len(cols)), dtype=bool)
+        known_rows, known_cols = rows >= 0, cols >= 0
+        matrix[np.ix_(known_rows, known_cols)] = self._participations[
+            np.ix_(rows[known_rows], cols[known_cols])
+        ]
+
+        return matrix
 
     def played_tournaments(self, pid: int) -> List[str]:
         """Return sorted list of played tournaments. Empty history will result in an empty list."""
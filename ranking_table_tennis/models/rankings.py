@@ -1,15 +1,44 @@
+import hashlib
 import logging
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
-from omegaconf import OmegaConf
 
 from ranking_table_tennis.configs import ConfigManager
+from ranking_table_tennis.models.schema import (
+    CATEGORY,
+    CHAMPIONSHIP_DETAILS_SCHEMA,
+    PARTICIPATIONS_DTYPE,
+    RANKING_SCHEMA,
+    RATING_DETAILS_SCHEMA,
+    apply_schema,
+)
 from ranking_table_tennis.models.tournaments import Tournaments
 
 logger = logging.getLogger(__name__)
 
 
+class _TopTournaments:
+    """Best n_tournaments points (and tids) of each player, sorted by points and tid descending.
+    Participations count every tournament with points."""
+
+    def __init__(self, n_tournaments: int) -> None:
+        self.n_tournaments = n_tournaments
+        self.best: Dict[int, List[Tuple[float, str]]] = {}
+        self.participations: Dict[int, int] = {}
+
+    def add(self, tid: str, pids: pd.Series, points: pd.Series) -> None:
+        # Not consider null points data to accelerate processing
+        with_points = (points > 0).to_numpy()
+        for pid, pid_points in zip(pids[with_points].tolist(), points[with_points].tolist()):
+            best = self.best.setdefault(pid, [])
+            best.append((pid_points, tid))
+            best.sort(reverse=True)
+            del best[self.n_tournaments :]
+            self.participations[pid] = self.participations.get(pid, 0) + 1
+
+
 class Rankings:
     def __init__(self, ranking_df: pd.DataFrame = None) -> None:
         self.update_config()
@@ -32,10 +61,47 @@ class Rankings:
         self.ranking_df = pd.DataFrame(ranking_df, columns=all_columns)
         self.rating_details_df = pd.DataFrame()
         self.championship_details_df = pd.DataFrame()
+        # Fingerprints of the inputs used to compute each tid, to resume computations
+        self.inputs_fingerprints: Dict[str, str] = {}
+        # Best tournaments of each player per category, accumulated up to the last computed tid
+        self._championship_top: Dict[str, _TopTournaments] = {}
+        self._championship_tids: List[str] = []
         self.verify_and_normalize()
 
+    def __getstate__(self) -> dict:
+        # Pending rows are saved into blocks. Materialized rankings and row positions of pids
+        # are rebuilt on demand after unpickling
+        self.commit()
+        state = self.__dict__.copy()
+        for attr in ("_ranking_df", "_pid_index", "_tids_sorted", "_tid_ordinals"):
+            state.pop(attr, None)
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        ranking_df = state.pop("ranking_df", None)
+        for attr in ("_tid_index", "_pid_index", "_tids_sorted", "_tid_ordinals"):
+            state.pop(attr, None)
+        self.__dict__.update(state)
+        self.__dict__.setdefault("inputs_fingerprints", {})
+        self.__dict__.setdefault("_championship_top", {})
+        self.__dict__.setdefault("_championship_tids", [])
+        if ranking_df is not None:
+            # Rankings pickled before they were stored as blocks per tid
+            self.ranking_df = ranking_df
+            self.commit()
+        else:
+            self.__dict__.setdefault("_dirty_rows", {})
+            self.__dict__.setdefault("_statistics", {})
+            if "_keys" not in state:
+                self._keys = {tid: set(block["pid"]) for tid, block in self._blocks.items()}
+            self._ranking_df = None
+            self._pid_index = {}
+            self._tids_sorted = None
+            self._tid_ordinals = None
+
     def __len__(self) -> int:
-        return len(self.ranking_df)
+        n_pending = sum(len(rows) for rows in self._pending_rows.values())
+        return sum(len(block) for block in self._blocks.values()) + n_pending
 
     def __str__(self) -> str:
         return str(self.ranking_df)
@@ -48,9 +114,176 @@ class Rankings:
 
     def __setitem__(self, tidpidcol: Tuple[str, int, str], value):
         tid, pid, col = tidpidcol
-        entries_indexes = (self.ranking_df.tid == tid) & (self.ranking_df.pid == pid)
-        self.ranking_df.loc[entries_indexes, col] = value
-        self.verify_and_normalize()
+        row = self._pid_row(tid, pid)
+        if row is not None:
+            self._set_rows_values(tid, np.array([row]), col, value)
+            self._mark_dirty(tid, [row])
+
+    @property
+    def ranking_df(self) -> pd.DataFrame:
+        """All rankings in a single DataFrame, materialized from the blocks of each tid.
+
+        Changes on the returned DataFrame are not saved into rankings.
+        """
+        if self._ranking_df is None:
+            self.commit()
+            if self._blocks:
+                self._ranking_df = apply_schema(
+                    pd.concat(self._blocks.values(), ignore_index=True), self._ranking_schema()
+                )
+            else:
+                self._ranking_df = pd.DataFrame(columns=self._columns)
+        return self._ranking_df
+
+    @ranking_df.setter
+    def ranking_df(self, ranking_df: pd.DataFrame) -> None:
+        """Split given rankings into blocks of rows of each tid. They are normalized on read."""
+        self._columns = list(ranking_df.columns)
+        self._blocks: Dict[str, pd.DataFrame] = {
+            tid: block.reset_index(drop=True)
+            for tid, block in ranking_df.groupby("tid", sort=False)
+        }
+        self._keys: Dict[str, set] = {}
+        for tid, block in self._blocks.items():
+            duplicated = block.duplicated("pid", keep=False)
+            if duplicated.any():
+                logger.error("Ranking entries duplicated:\n%s", block[duplicated])
+            self._keys[tid] = set(block["pid"])
+        self._dirty_rows: Dict[str, set] = {
+            tid: set(range(len(block))) for tid, block in self._blocks.items()
+        }
+        self._pending_rows: Dict[str, List[dict]] = {}
+        self._to_categorize: set = set()
+        self._unsorted_tids: set = set(self._blocks)
+        self._ranking_df: pd.DataFrame | None = None
+        self._pid_index: Dict[str, dict] = {}
+        self._tids_sorted: List[str] | None = None
+        self._tid_ordinals: Dict[str, int] | None = None
+        # Participation statistics of each tid, see get_statistics
+        self._statistics: Dict[str, Dict[str, int]] = {}
+
+    def _block(self, tid: str) -> pd.DataFrame | None:
+        """Rows of tid, including the pending ones. None if tid is unknown."""
+        if tid in self._pending_rows:
+            pending_df = pd.DataFrame(self._pending_rows.pop(tid), columns=self._columns)
+            start = len(self._blocks.get(tid, ()))
+            if tid in self._blocks:
+                pending_df = pd.concat([self._blocks[tid], pending_df], ignore_index=True)
+            self._blocks[tid] = pending_df
+            self._mark_dirty(tid, range(start, len(pending_df)))
+            self._changed(tid)
+        if tid in self._dirty_rows:
+            self._normalize_dirty_rows(tid)
+        if tid in self._to_categorize:
+            self._to_categorize.discard(tid)
+            self.update_categories(tid)
+        return self._blocks.get(tid)
+
+    def commit(self) -> None:
+        """Save pending entries into their blocks and normalize modified rows."""
+        for tid in set(self._pending_rows) | set(self._dirty_rows) | self._to_categorize:
+            self._block(tid)
+
+    def _mark_dirty(self, tid: str, rows) -> None:
+        """Rows to be normalized on next read of tid."""
+        self._dirty_rows.setdefault(tid, set()).update(rows)
+
+    def _changed(self, tid: str) -> None:
+        """Forget materialized rankings and row positions of pids after a change on tid."""
+        self._ranking_df = None
+        self._unsorted_tids.add(tid)
+        self._pid_index.pop(tid, None)
+        self._statistics.pop(tid, None)
+
+    def _add_rows(self, tid: str, rows: pd.DataFrame | List[dict]) -> None:
+        """Append rows to the ones of tid, pending rows are added to the block when needed."""
+        if tid not in self._keys:
+            self._keys[tid] = set()
+            self._tids_sorted = None
+            self._tid_ordinals = None
+        new_pids = (
+            rows["pid"].tolist() if isinstance(rows, pd.DataFrame) else [row["pid"] for row in rows]
+        )
+        # Duplicated entries are detected with the known pids of tid
+        keys = self._keys[tid]
+        duplicated = []
+        for pid in new_pids:
+            if pid in keys:
+                duplicated.append(pid)
+            keys.add(pid)
+        if duplicated:
+            logger.error("Ranking entries duplicated on %s: %s", tid, duplicated)
+
+        if isinstance(rows, pd.DataFrame):
+            block = self._block(tid)
+            if block is not None:
+                rows = pd.concat([block, rows], ignore_index=True)
+            self._blocks[tid] = rows.reset_index(drop=True)
+        else:
+            self._pending_rows.setdefault(tid, []).extend(rows)
+        self._changed(tid)
+
+    def _pid_row(self, tid: str, pid: int) -> int | None:
+        """Position of the row of (tid, pid) in the block of tid, None if unknown."""
+        if tid not in self._pid_index:
+            block = self._block(tid)
+            pid_rows: dict = {}
+            if block is not None:
+                for row, tid_pid in enumerate(block["pid"].tolist()):
+                    pid_rows.setdefault(tid_pid, row)
+            self._pid_index[tid] = pid_rows
+        return self._pid_index[tid].get(pid)
+
+    def _set_rows_values(self, tid: str, rows: np.ndarray, col: str | List[str], values) -> None:
+        """Assign values to col (or cols) of the block of tid at given row positions."""
+        block = self._block(tid)
+        col_loc = (
+            block.columns.get_loc(col) if isinstance(col, str) else block.columns.get_indexer(col)
+        )
+        block.iloc[rows, col_loc] = values
+        self._ranking_df = None
+        self._unsorted_tids.add(tid)
+        self._statistics.pop(tid, None)
+        if col == "pid":
+            self._pid_index.pop(tid, None)
+            self._keys[tid] = set(block["pid"])
+
+    def _pids_rows(self, tid: str, pids) -> np.ndarray:
+        """Positions of the rows of given pids in the block of tid, -1 for unknown pids."""
+        pid_rows = [self._pid_row(tid, pid) for pid in pids]
+        return np.array([-1 if row is None else row for row in pid_rows], dtype=np.intp)
+
+    def update_many(self, tid: str, pids, column: str, values) -> None:
+        """Assign values to column of given pids of tid in a single write.
+
+        Unknown pids are ignored. Last value is kept for repeated pids.
+        """
+        rows = self._pids_rows(tid, pids)
+        # A single value is assigned to every pid
+        values = np.broadcast_to(
+            pd.Series(values).to_numpy() if np.ndim(values) else values, rows.shape
+        )
+        # Keep the last occurrence of each row
+        unique_rows, last_reversed = np.unique(rows[::-1], return_index=True)
+        last = len(rows) - 1 - last_reversed[unique_rows >= 0]
+        if len(last) == 0:
+            return
+        self._set_rows_values(tid, rows[last], column, values[last])
+        self._mark_dirty(tid, rows[last].tolist())
+
+    def scale_many(self, tid: str, pids, column: str, factor: float) -> None:
+        """Multiply column of given pids of tid by factor in a single write.
+
+        Unknown pids are ignored. Repeated pids are scaled once per occurrence.
+        """
+        rows = self._pids_rows(tid, pids)
+        rows = rows[rows >= 0]
+        if len(rows) == 0:
+            return
+        scaled = self._block(tid)[column].to_numpy(dtype=float).copy()
+        np.multiply.at(scaled, rows, factor)
+        changed_rows = np.unique(rows)
+        self._set_rows_values(tid, changed_rows, column, scaled[changed_rows])
 
     def points_cat_columns(self) -> List[str]:
         return ["points_cat_%d" % d for d, _ in enumerate(self.cfg.categories, 1)]
@@ -66,27 +299,31 @@ class Rankings:
 
     def update_config(self):
         self.cfg = ConfigManager().current_config
+        self.rules = ConfigManager().current_rules
 
-    def get_entries(self, tid: str, pid: int | None = None, col: str | None = None):
-        entries_indexes = self.ranking_df.tid == tid
+    def fingerprint(self, tid: str) -> str:
+        """Hash of the entries of tid, independent of their order."""
+        tid_entries = self._block(tid).sort_values("pid")
+        hashed_rows = pd.util.hash_pandas_object(tid_entries, index=False)
+        return hashlib.sha256(hashed_rows.to_numpy().tobytes()).hexdigest()
 
+    def get_entries(self, tid: str, pid: int | None = None, col: str | None = None):
+        block = self._block(tid)
         if pid is not None:
-            pid_indexes = self.ranking_df.pid == pid
-            entries_indexes = entries_indexes & pid_indexes
-            if not col and entries_indexes.any():
-                return self.ranking_df.loc[entries_indexes].iloc[0]
-
-        if col:
-            at_index = self.ranking_df.loc[entries_indexes].first_valid_index()
-            return self.ranking_df.at[at_index, col]
-
-        if entries_indexes.any():
-            return self.ranking_df.loc[entries_indexes]
+            row = self._pid_row(tid, pid)
+            if col:
+                if row is None:
+                    raise KeyError((tid, pid, col))
+                return block.iat[row, block.columns.get_loc(col)]
+            if row is not None:
+                return block.iloc[row]
+        elif block is not None and not block.empty:
+            if col:
+                return block.iat[0, block.columns.get_loc(col)]
+            return block.copy()
 
     def add_entry(self, ranking_entry: pd.Series) -> None:
-        ranking_entry_df = ranking_entry.to_frame().T
-        self.ranking_df = pd.concat([self.ranking_df, ranking_entry_df], axis="index")
-        self.verify_and_normalize()
+        self._add_rows(ranking_entry.tid, [self._normalize_entry(ranking_entry.to_dict())])
 
     def add_new_entry(
         self,
@@ -96,25 +333,18 @@ class Rankings:
         active: bool = False,
         initial_category: str = "",
     ) -> None:
-        new_entry = pd.DataFrame(
-            {
-                "tid": tid,
-                "pid": pid,
-                "rating": initial_rating,
-                "active": active,
-                "category": initial_category,
-            },
-            index=[-1],
-        )
-        self.ranking_df = pd.concat([self.ranking_df, new_entry], ignore_index=True, axis="index")
-        self.verify_and_normalize()
-        self.update_categories(tid)
-
-    def verify_and_normalize(self) -> None:
-        duplicated = self.ranking_df.duplicated(["tid", "pid"], keep=False)
-        if duplicated.any():
-            logger.error("Ranking entries duplicated:\n%s", self.ranking_df[duplicated])
+        new_entry = {
+            "tid": tid,
+            "pid": pid,
+            "rating": initial_rating,
+            "active": active,
+            "category": initial_category,
+        }
+        self._add_rows(tid, [self._normalize_entry(new_entry)])
+        # Categories of tid are updated when its rows are needed
+        self._to_categorize.add(tid)
 
+    def _default_values(self) -> dict:
         default_rating = -1000.0
         default_active = False
         default_category = ""
@@ -140,32 +370,68 @@ class Rankings:
             **cat_col_values,
             **cum_tid_values,
         }
-        self.ranking_df.fillna(value=default_values, inplace=True)
-        self.ranking_df.date = pd.to_datetime(self.ranking_df.date)
-        self.ranking_df = self.ranking_df.astype({"rating": "float"})  # Force rating to be float
+
+        return default_values
+
+    def _normalize_entry(self, entry: dict) -> dict:
+        """Fill missing values of a single entry with defaults."""
+        normalized_entry = {col: entry.get(col) for col in self._columns}
+        for col, default_value in self._default_values().items():
+            if col in normalized_entry and pd.isna(normalized_entry[col]):
+                normalized_entry[col] = default_value
+        normalized_entry["date"] = pd.to_datetime(normalized_entry["date"])
+
+        return normalized_entry
+
+    def _normalize_dirty_rows(self, tid: str) -> None:
+        block = self._blocks[tid]
+        rows = np.array(sorted(self._dirty_rows.pop(tid)), dtype=np.intp)
+        if len(rows) == len(block):
+            block = block.astype(
+                {col: object for col in block.columns if block[col].dtype == CATEGORY}
+            )
+            block.fillna(value=self._default_values(), inplace=True)
+        else:
+            for col, default_value in self._default_values().items():
+                col_loc = block.columns.get_loc(col)
+                missing = rows[block.iloc[rows, col_loc].isna().to_numpy()]
+                if len(missing) > 0:
+                    if block[col].dtype == CATEGORY:
+                        block[col] = block[col].astype(object)
+                    block.iloc[missing, col_loc] = default_value
+        if not pd.api.types.is_datetime64_any_dtype(block["date"]):
+            block["date"] = pd.to_datetime(block["date"])
+        if block["rating"].dtype != float:
+            block["rating"] = block["rating"].astype("float")  # Force rating to be float
+        self._blocks[tid] = apply_schema(block, self._ranking_schema())
+        self._ranking_df = None
+
+    def _ranking_schema(self) -> Dict[str, str]:
+        participations_schema = {
+            participations_col: PARTICIPATIONS_DTYPE
+            for participations_col in self.participations_cat_columns()
+        }
+        return {**RANKING_SCHEMA, **participations_schema}
+
+    def verify_and_normalize(self) -> None:
+        """Normalize all rows of rankings."""
+        for tid, block in self._blocks.items():
+            self._mark_dirty(tid, range(len(block)))
+        self.commit()
 
     def initialize_new_ranking(self, new_tid: str, prev_tid: str) -> None:
-        entries_indexes = self.ranking_df.tid == prev_tid
-        new_ranking = self.ranking_df.loc[entries_indexes].copy()
+        new_ranking = self._block(prev_tid).copy()
         new_ranking.loc[:, "tid"] = new_tid
         new_ranking.loc[:, self.points_cat_columns() + self.cum_points_cat_columns()] = 0.0
         new_ranking.loc[:, self.participations_cat_columns()] = 0.0
         new_ranking.loc[:, self.cum_tids_cat_columns()] = ""
-        self.ranking_df = pd.concat([self.ranking_df, new_ranking], ignore_index=True)
+        self._add_rows(new_tid, new_ranking)
 
     def _batch_rating_to_category(self, rating: pd.Series) -> pd.Series:
-        # Order reversed to assign first category as last option
-        category_names = reversed(
-            self.cfg.categories[:-2]
-        )  # Last and fan categories are not required
-        thresholds = reversed(self.cfg.compute.categories_thresholds)
-        # Default to last category that it's not fan
-        category = pd.Series(self.cfg.categories[-2], index=rating.index, name="category")
-        for cat, th in zip(category_names, thresholds):
-            greater_rating = rating >= th
-            category.loc[greater_rating] = cat
-
-        return category
+        category_names = np.array(self.rules.categories, dtype=object)
+        category = category_names[self.rules.rating_category_codes(rating.to_numpy())]
+
+        return pd.Series(category, index=rating.index, name="category")
 
     def update_categories(self, tid) -> None:
         """Players are ranked based on rating and given thresholds.
@@ -178,78 +444,99 @@ class Rankings:
         - 250 > rating         -> third category
         """
         # FIXME it is not working for players of the fan category
-        tid_entries = self.ranking_df.tid == tid
-        self.ranking_df.loc[tid_entries, "category"] = self._batch_rating_to_category(
-            self.ranking_df.loc[tid_entries, "rating"]
+        block = self._block(tid)
+        if block is None:
+            return
+        self._set_rows_values(
+            tid,
+            np.arange(len(block)),
+            "category",
+            self._batch_rating_to_category(block["rating"]).to_numpy(),
         )
 
-    def sort_rankings(self):
-        """Sort rankings DataFrame by tid ascending, rating descending, pid ascending."""
-        self.ranking_df = self.ranking_df.sort_values(
-            ["tid", "rating", "pid"], ascending=[True, False, True]
-        ).reset_index(drop=True)
+    def get_not_own_category_mask(
+        self, tid: str, pids: List[int], best_rounds: pd.DataFrame
+    ) -> np.ndarray:
+        """Boolean mask aligned to pids, True for players that didn't play their own category
+        in tid. Players of the fan category are not considered."""
+        own_categories = pd.DataFrame({"pid": pids}).merge(
+            self._block(tid).loc[:, ["pid", "category"]], on="pid", how="left"
+        )
+        played_categories = best_rounds.loc[:, ["pid", "category"]].drop_duplicates()
+        played_own_category = (
+            own_categories.merge(
+                played_categories, on=["pid", "category"], how="left", indicator=True
+            )["_merge"]
+            == "both"
+        ).to_numpy()
+        fan_category = (own_categories["category"] == self.cfg.categories[-1]).to_numpy()
 
-    def _points_to_assign(self, rating_winner: float, rating_loser: float) -> Tuple[float, float]:
-        """Points to add to winner and to deduce from loser given ratings of winner and loser."""
-        rating_diff = rating_winner - rating_loser
+        return ~played_own_category & ~fan_category
 
-        assignation_table = self.cfg.expected_result_table
-        if rating_diff < 0:
-            rating_diff *= -1.0
-            assignation_table = self.cfg.unexpected_result_table
+    def sort_rankings(self):
+        """Sort rankings by tid ascending, rating descending, pid ascending."""
+        self.commit()
+        for tid in self._unsorted_tids & set(self._blocks):
+            self._blocks[tid] = (
+                self._blocks[tid]
+                .sort_values(["rating", "pid"], ascending=[False, True])
+                .reset_index(drop=True)
+            )
+            self._pid_index.pop(tid, None)
+        self._unsorted_tids = set()
+        self._blocks = {tid: self._blocks[tid] for tid in sorted(self._blocks)}
+        self._ranking_df = None
 
-        assignation_table = pd.DataFrame(
-            OmegaConf.to_container(assignation_table, resolve=True)
-        ).to_numpy()
+    def _batch_points_to_assign(self, rating_diff: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Points to add to winners and to deduce from losers given rating differences
+        (rating_winner - rating_loser) of a batch of matches."""
+        return self.rules.points_to_assign(rating_diff)
 
-        # Select first row that is appropiate for given rating_diff
-        diff_threshold, points_to_winner, points_to_loser = assignation_table[
-            assignation_table[:, 0] > rating_diff
-        ][0]
+    def _points_to_assign(self, rating_winner: float, rating_loser: float) -> Tuple[float, float]:
+        """Points to add to winner and to deduce from loser given ratings of winner and loser."""
+        points_to_winner, points_to_loser = self._batch_points_to_assign(
+            np.array([rating_winner - rating_loser], dtype=float)
+        )
 
-        return points_to_winner, points_to_loser
+        return points_to_winner[0], points_to_loser[0]
 
-    def _get_factor(
+    def _batch_get_factor(
         self,
-        rating_winner: float,
-        rating_loser: float,
-        category_winner: str,
-        category_loser: str,
-        not_own_category: bool,
-    ) -> float:
-        """Returns factor for rating computation. It considers given winner and loser category.
+        rating_diff: np.ndarray,
+        category_winner: np.ndarray,
+        category_loser: np.ndarray,
+        not_own_category: np.ndarray,
+    ) -> np.ndarray:
+        """Returns factors for rating computation. It considers given winner and loser categories.
         Players must play their own category"""
-        rating_diff = rating_winner - rating_loser
-        category_factor = 1.0
-        if category_winner != category_loser and not not_own_category:
-            category_factor = self.cfg.compute.category_expected_factor
-            if rating_diff < 0:
-                category_factor = self.cfg.compute.category_unexpected_factor
-
-        factor = self.cfg.compute.rating_factor * category_factor
-
-        return factor
-
-    def _new_ratings_from_match(self, match):
-        [to_winner, to_loser] = self._points_to_assign(
-            match["winner_rating"], match["loser_rating"]
-        )
-        factor = self._get_factor(
-            match["winner_rating"],
-            match["loser_rating"],
-            match["winner_category"],
-            match["loser_category"],
-            match["not_own_category"],
+        category_factor = np.where(
+            (category_winner != category_loser) & ~not_own_category,
+            np.where(
+                rating_diff < 0,
+                self.rules.category_unexpected_factor,
+                self.rules.category_expected_factor,
+            ),
+            1.0,
         )
 
-        to_winner, to_loser = factor * to_winner, factor * to_loser
-        match["rating_to_winner"], match["rating_to_loser"], match["factor"] = (
-            to_winner,
-            -to_loser,
-            factor,
+        return self.rules.rating_factor * category_factor
+
+    def _batch_new_ratings_from_matches(self, matches: pd.DataFrame) -> pd.DataFrame:
+        """Assign rating_to_winner, rating_to_loser and factor to every match at once."""
+        rating_diff = (matches["winner_rating"] - matches["loser_rating"]).to_numpy(dtype=float)
+        to_winner, to_loser = self._batch_points_to_assign(rating_diff)
+        factor = self._batch_get_factor(
+            rating_diff,
+            matches["winner_category"].to_numpy(),
+            matches["loser_category"].to_numpy(),
+            matches["not_own_category"].to_numpy(dtype=bool),
         )
 
-        return match
+        matches["rating_to_winner"] = factor * to_winner
+        matches["rating_to_loser"] = -(factor * to_loser)
+        matches["factor"] = factor
+
+        return matches
 
     def compute_new_ratings(
         self,
@@ -261,16 +548,13 @@ class Rankings:
         """Compute ratings(new_tid) based on matches(new_tid) and ratings(old_tid).
         Details of rating changes per match are stored in rating_details_df.
         """
-        new_tid_indexes = self.ranking_df.tid == new_tid
-        old_tid_indexes = self.ranking_df.tid == old_tid
-
         # Get tid matches data from tournaments
         matches = tournaments.get_matches(new_tid).copy()
         matches.insert(len(matches.columns), "rating_to_winner", None)
         matches.insert(len(matches.columns), "rating_to_loser", None)
 
         # Assign ranking data to matches, such as category and rating of players
-        ranking_data = self.ranking_df.loc[old_tid_indexes, ["pid", "category", "rating"]].copy()
+        ranking_data = self._block(old_tid).loc[:, ["pid", "category", "rating"]]
         winner_data = ranking_data.rename(
             columns={"category": "winner_category", "rating": "winner_rating"}
         )
@@ -288,62 +572,71 @@ class Rankings:
         )
 
         # Compute ratings changes per match
-        matches_processed = matches.apply(self._new_ratings_from_match, axis="columns")
-
-        # Compute overall rating changes per player
-        translations = {
-            "rating_to_winner": "rating_change",
-            "rating_to_loser": "rating_change",
-            "winner_pid": "pid",
-            "loser_pid": "pid",
-        }
-        winner_changes = matches_processed.loc[:, ["winner_pid", "rating_to_winner"]].rename(
-            columns=translations
+        matches_processed = self._batch_new_ratings_from_matches(matches)
+
+        # Compute overall rating changes per player, pids are coded as integers to sum up
+        pids = np.concatenate(
+            [matches_processed["winner_pid"].to_numpy(), matches_processed["loser_pid"].to_numpy()]
         )
-        loser_changes = matches_processed.loc[:, ["loser_pid", "rating_to_loser"]].rename(
-            columns=translations
+        changes = np.concatenate(
+            [
+                matches_processed["rating_to_winner"].to_numpy(),
+                matches_processed["rating_to_loser"].to_numpy(),
+            ]
         )
-        rating_changes = pd.concat([winner_changes, loser_changes], ignore_index=True)
-        rating_changes = rating_changes.groupby("pid").sum()
-
-        # Assign changes to ranking_df and save details
-        reordered_changes = self.merge_preserve_left_index(
-            self.ranking_df.loc[new_tid_indexes, "pid"], rating_changes, on="pid"
+        pid_codes, unique_pids = pd.factorize(pids)
+        rating_changes = np.bincount(pid_codes, weights=changes, minlength=len(unique_pids))
+
+        # Assign changes to rankings and save details
+        new_ranking = self._block(new_tid)
+        changes_codes = pd.Index(unique_pids).get_indexer(new_ranking["pid"])
+        played = np.flatnonzero(changes_codes >= 0)
+        self._set_rows_values(
+            new_tid,
+            played,
+            "rating",
+            new_ranking["rating"].to_numpy()[played] + rating_changes[changes_codes[played]],
         )
-        self.ranking_df.loc[reordered_changes.index, "rating"] += reordered_changes.loc[
-            :, "rating_change"
-        ]
 
-        self.rating_details_df = pd.concat([self.rating_details_df, matches_processed])
+        self.rating_details_df = apply_schema(
+            pd.concat([self.rating_details_df, matches_processed]), RATING_DETAILS_SCHEMA
+        )
         self.update_categories(new_tid)
 
-    def compute_category_points(self, tid: str, best_rounds: pd.DataFrame):
-        best_rounds_points_cfg = OmegaConf.to_container(self.cfg.best_rounds_points, resolve=True)
-        best_rounds_points_df = pd.DataFrame(best_rounds_points_cfg).set_index("round_reached")
-        col_translations = {"round_reached": "best_round", "level_1": "category", 0: "points"}
-        points_assignation_table = (
-            best_rounds_points_df.stack().reset_index().rename(columns=col_translations)
+    def points_of_best_rounds(self, tid: str, best_rounds: pd.DataFrame) -> pd.DataFrame:
+        """Best rounds of tid with known category and round, with the points they assign."""
+        # Points of each best round are read from the categories x rounds matrix
+        category_codes = self.rules.category_codes(best_rounds["category"])
+        round_codes = self.rules.round_codes(best_rounds["best_round"])
+        known = (category_codes >= 0) & (round_codes >= 0)
+
+        best_rounds_pointed = (
+            best_rounds.loc[known]
+            .assign(points=self.rules.best_rounds_points[category_codes[known], round_codes[known]])
+            .sort_values(["category", "points", "pid"], ascending=[True, False, True])
         )
-
-        best_rounds_pointed = best_rounds.merge(
-            points_assignation_table, on=["category", "best_round"]
-        ).sort_values(["category", "points", "pid"], ascending=[True, False, True])
         best_rounds_pointed.insert(0, "tid", tid)
 
-        for cat, points_cat_col in zip(self.cfg.categories, self.points_cat_columns()):
-            rows_reordered = self.merge_preserve_left_index(
-                self.ranking_df.loc[self.ranking_df.tid == tid, "pid"],
-                best_rounds_pointed[best_rounds_pointed.category == cat],
-                on="pid",
-                how="inner",
-            )
-            self.ranking_df.loc[rows_reordered.index, points_cat_col] = rows_reordered.loc[
-                :, "points"
-            ]
+        return best_rounds_pointed
+
+    def compute_category_points(self, tid: str, best_rounds: pd.DataFrame):
+        best_rounds_pointed = self.points_of_best_rounds(tid, best_rounds)
+
+        # Points of all categories are scattered at once by row position of pids in tid
+        rows = self._pids_rows(tid, best_rounds_pointed["pid"])
+        category_codes = self.rules.category_codes(best_rounds_pointed["category"])
+        in_ranking = rows >= 0
+        points_cat_columns = self.points_cat_columns()
+        points = self._block(tid).loc[:, points_cat_columns].to_numpy(dtype=float).copy()
+        assigned_points = best_rounds_pointed["points"].to_numpy()
+        points[rows[in_ranking], category_codes[in_ranking]] = assigned_points[in_ranking]
+        changed_rows = np.unique(rows[in_ranking])
+        self._set_rows_values(tid, changed_rows, points_cat_columns, points[changed_rows])
 
         # Save details of assigned points
-        self.championship_details_df = pd.concat(
-            [self.championship_details_df, best_rounds_pointed], ignore_index=True
+        self.championship_details_df = apply_schema(
+            pd.concat([self.championship_details_df, best_rounds_pointed], ignore_index=True),
+            CHAMPIONSHIP_DETAILS_SCHEMA,
         )
 
     @staticmethod
@@ -355,149 +648,167 @@ class Rankings:
         Compute and save championship points, selected tids, and participations per category
         :return: None
         """
-        n_tournaments = self.cfg.compute.masters_N_tournaments_to_consider
-        tid_indexes = self.ranking_df.tid == tid
-        rankings = self.ranking_df[
-            self.ranking_df.tid != self.cfg.initial_metadata.initial_tid
-        ]  # Remove initial tid data
+        self._update_championship_top(tid)
 
+        tid_pids = self._block(tid)["pid"].tolist()
         for points_cat_col, cum_points_cat_col, cum_tids_cat_col, n_played_cat_col in zip(
             self.points_cat_columns(),
             self.cum_points_cat_columns(),
             self.cum_tids_cat_columns(),
             self.participations_cat_columns(),
         ):
-            # Best n_tournaments, not consider null points data to accelerate processing
-            rankings_not_null = rankings[rankings[points_cat_col] > 0].copy()
-            n_best = (
-                rankings_not_null.sort_values(by=[points_cat_col, "tid"], ascending=[False, False])
-                .groupby("pid")
-                .head(n_tournaments)
-            )
+            top_tournaments = self._championship_top[points_cat_col]
+            selected = [
+                (row, pid) for row, pid in enumerate(tid_pids) if pid in top_tournaments.best
+            ]
+            if not selected:
+                continue
+            rows = np.array([row for row, _ in selected], dtype=np.intp)
+            best_per_pid = [top_tournaments.best[pid] for _, pid in selected]
 
             # Cumulated points of the best n_tournaments
-            cum_points_cat_values = (
-                n_best.groupby("pid")[points_cat_col].sum().rename(cum_points_cat_col)
-            )
-            rows_reordered = self.merge_preserve_left_index(
-                self.ranking_df.loc[tid_indexes, "pid"],
-                cum_points_cat_values,
-                on="pid",
-                how="inner",
-            )
-            self.ranking_df.loc[rows_reordered.index, cum_points_cat_col] = rows_reordered.loc[
-                :, cum_points_cat_col
-            ]
+            cum_points = [sum(points for points, _ in best) for best in best_per_pid]
+            self._set_rows_values(tid, rows, cum_points_cat_col, np.array(cum_points, dtype=float))
 
             # Details of cumulated points, formatted as POINTS (TID) + POINTS(TID) + ...
-            n_best[cum_tids_cat_col] = (
-                n_best[points_cat_col].astype(int).astype(str) + " (" + n_best["tid"] + ") + "
-            )
-            selected_tids_cat_values = (
-                n_best.groupby("pid")[cum_tids_cat_col].sum().str.slice(stop=-3)
-            )
-            rows_reordered = self.merge_preserve_left_index(
-                self.ranking_df.loc[tid_indexes, "pid"],
-                selected_tids_cat_values,
-                on="pid",
-                how="inner",
-            )
-            self.ranking_df.loc[rows_reordered.index, cum_tids_cat_col] = rows_reordered.loc[
-                :, cum_tids_cat_col
+            selected_tids = [
+                " + ".join(f"{int(points)} ({best_tid})" for points, best_tid in best)
+                for best in best_per_pid
             ]
+            self._set_rows_values(
+                tid, rows, cum_tids_cat_col, np.array(selected_tids, dtype=object)
+            )
 
             # Total number of participations
-            n_played_cat_values = rankings_not_null.groupby(["pid"])[points_cat_col].count()
-            n_played_cat_values.rename(n_played_cat_col, inplace=True)
-            rows_reordered = self.merge_preserve_left_index(
-                self.ranking_df.loc[tid_indexes, "pid"], n_played_cat_values, on="pid", how="inner"
+            n_played = [top_tournaments.participations[pid] for _, pid in selected]
+            self._set_rows_values(
+                tid, rows, n_played_cat_col, np.array(n_played, dtype=PARTICIPATIONS_DTYPE)
             )
-            self.ranking_df.loc[rows_reordered.index, n_played_cat_col] = rows_reordered.loc[
-                :, n_played_cat_col
-            ]
 
-    def _activate_or_inactivate_player(
-        self,
-        ranking_entry,
-        tids_list,
-        active_window_tids,
-        inactive_window_tids,
-        players,
-        initial_active_pids,
-    ):
-        # Avoid activate or inactivate players after the first tournament.
-        # activate_window = cfg.compute.tournament window to activate"]
-        tourns_to_activate = self.cfg.compute.tournaments_to_activate
-        inactivate_window = self.cfg.compute.tournament_window_to_inactivate
-
-        played_tids = players.played_tournaments(ranking_entry.pid)
+    def _update_championship_top(self, tid: str) -> None:
+        """Add points of tid to the best tournaments of each player and category.
 
-        if not ranking_entry.active:
-            last_tourns = [p_tid for p_tid in played_tids if p_tid in active_window_tids]
-            # activate if he has played at least tourns_to_activate tournaments
-            active = len(last_tourns) >= tourns_to_activate
-        else:
-            last_tourns = [p_tid for p_tid in played_tids if p_tid in inactive_window_tids]
-            # don't inactivate during tournaments window if it is an initial active player
-            if (
-                tids_list.index(ranking_entry.tid) + 1 < inactivate_window
-                and ranking_entry.pid in initial_active_pids
-            ):
-                active = True
-            else:
-                active = len(last_tourns) > 0
+        Best tournaments are rebuilt from all computed tids (but the initial one) if the
+        accumulated ones are not the previous tids, or the number of tournaments changed.
+        """
+        n_tournaments = self.cfg.compute.masters_N_tournaments_to_consider
+        previous_tids = [
+            prev_tid
+            for prev_tid in self._get_tids_list()
+            if prev_tid not in (self.cfg.initial_metadata.initial_tid, tid)
+        ]
+        top_tournaments = self._championship_top
+        if (
+            self._championship_tids != previous_tids
+            or set(top_tournaments) != set(self.points_cat_columns())
+            or any(top.n_tournaments != n_tournaments for top in top_tournaments.values())
+        ):
+            self._championship_tids = []
+            self._championship_top = {
+                points_cat_col: _TopTournaments(n_tournaments)
+                for points_cat_col in self.points_cat_columns()
+            }
+            for prev_tid in previous_tids:
+                self._add_championship_points(prev_tid)
+
+        self._add_championship_points(tid)
+
+    def _add_championship_points(self, tid: str) -> None:
+        tid_entries = self._block(tid)
+        for points_cat_col, top_tournaments in self._championship_top.items():
+            top_tournaments.add(tid, tid_entries["pid"], tid_entries[points_cat_col])
+        self._championship_tids.append(tid)
+
+    def add_computed_rankings(
+        self,
+        ranking_df: pd.DataFrame,
+        rating_details_df: pd.DataFrame,
+        championship_details_df: pd.DataFrame,
+    ) -> None:
+        """Add rankings of new tids, and their details, computed out of rankings.
 
-        return active
+        Rankings are normalized as the computed ones and sorted.
+        """
+        for tid, block in ranking_df.groupby("tid", sort=False):
+            self._add_rows(tid, block.reset_index(drop=True))
+            self._mark_dirty(tid, range(len(block)))
+        self.rating_details_df = apply_schema(
+            pd.concat([self.rating_details_df, rating_details_df]), RATING_DETAILS_SCHEMA
+        )
+        self.championship_details_df = apply_schema(
+            pd.concat([self.championship_details_df, championship_details_df], ignore_index=True),
+            CHAMPIONSHIP_DETAILS_SCHEMA,
+        )
+        # Best tournaments are rebuilt from rankings if more tids are computed later
+        self._championship_tids = []
+        self.sort_rankings()
 
     def update_active_players(self, tid: str, players, initial_tid: str):
         # Avoid activate or inactivate players after the first tournament.
         activate_window = self.cfg.compute.tournament_window_to_activate
         inactivate_window = self.cfg.compute.tournament_window_to_inactivate
+        tourns_to_activate = self.cfg.compute.tournaments_to_activate
 
-        indexes = (self.ranking_df.tid == initial_tid) & self.ranking_df.active
-        initial_active_players = list(self.ranking_df.loc[indexes, "pid"].unique())
+        initial_ranking = self._block(initial_tid)
+        initial_active_players = initial_ranking.loc[initial_ranking.active, "pid"].unique()
 
         tids_list = self._get_tids_list()
+        tid_position = self._get_tid_ordinal(tid)
         active_window_tids = tids_list[
-            max(0, tids_list.index(tid) - activate_window + 1) : tids_list.index(tid)
-            + 1  # noqa
+            max(0, tid_position - activate_window + 1) : tid_position + 1
         ]
         inactive_window_tids = tids_list[
-            max(0, tids_list.index(tid) - inactivate_window + 1) : tids_list.index(tid)
-            + 1  # noqa
+            max(0, tid_position - inactivate_window + 1) : tid_position + 1
         ]
 
-        tid_criteria = self.ranking_df.tid == tid
-
-        self.ranking_df.loc[tid_criteria, "active"] = self.ranking_df[tid_criteria].apply(
-            self._activate_or_inactivate_player,
-            axis="columns",
-            args=(
-                tids_list,
-                active_window_tids,
-                inactive_window_tids,
-                players,
-                initial_active_players,
-            ),
+        tid_ranking = self._block(tid)
+        pids = tid_ranking["pid"].to_numpy()
+        was_active = tid_ranking["active"].to_numpy(dtype=bool)
+
+        # activate if he has played at least tourns_to_activate tournaments
+        played_to_activate = players.participation_matrix(pids, active_window_tids).sum(axis=1)
+        # don't inactivate during tournaments window if it is an initial active player
+        keep_initial_active = (tid_position + 1 < inactivate_window) & np.isin(
+            pids, initial_active_players
+        )
+        played_to_keep_active = players.participation_matrix(pids, inactive_window_tids).any(axis=1)
+
+        active = np.where(
+            was_active,
+            keep_initial_active | played_to_keep_active,
+            played_to_activate >= tourns_to_activate,
         )
+        self._set_rows_values(tid, np.arange(len(tid_ranking)), "active", active)
 
     def _get_tids_list(self) -> List[str]:
-        return sorted(list(self.ranking_df.tid.unique()))
+        if self._tids_sorted is None:
+            self._tids_sorted = sorted(set(self._blocks) | set(self._pending_rows))
+            self._tid_ordinals = {tid: num for num, tid in enumerate(self._tids_sorted)}
+        return self._tids_sorted
+
+    def get_tids(self) -> List[str]:
+        """Sorted tids with rankings, the initial tid is the first one."""
+        return list(self._get_tids_list())
+
+    def _get_tid_ordinal(self, tid: str) -> int:
+        """Position of tid on the sorted list of tids, the initial tid is the first one."""
+        self._get_tids_list()
+        return self._tid_ordinals[tid]
 
     def promote_players(self, tid: str, tournaments: "Tournaments") -> None:
         tournament_df = tournaments[tid]
-        for match_index, match in tournament_df[tournament_df.promote].iterrows():
-            self[tid, match.winner_pid, "category"] = match.category
-            logger.debug("%s promoted to %s", match.winner, match.category)
+        promotions = tournament_df[tournament_df.promote]
+        self.update_many(tid, promotions.winner_pid, "category", promotions.category)
+        for winner, category in zip(promotions.winner, promotions.category):
+            logger.debug("%s promoted to %s", winner, category)
 
     def apply_sanction(self, tid: str, tournaments: "Tournaments") -> None:
         tournament_df = tournaments[tid]
-        for match_index, match in tournament_df[tournament_df.sanction].iterrows():
-            for cat_col in self.points_cat_columns():
-                self[tid, match.loser_pid, cat_col] *= self.cfg.compute.sanction_factor
-            logger.debug(
-                "Apply sanction factor %s on: %s", self.cfg.compute.sanction_factor, match.winner
-            )
+        sanctions = tournament_df[tournament_df.sanction]
+        for cat_col in self.points_cat_columns():
+            self.scale_many(tid, sanctions.loser_pid, cat_col, self.rules.sanction_factor)
+        for winner in sanctions.winner:
+            logger.debug("Apply sanction factor %s on: %s", self.rules.sanction_factor, winner)
 
     def get_rating_details(self, tid: str) -> pd.DataFrame:
         return self.rating_details_df.loc[self.rating_details_df.tid == tid].copy()
@@ -505,12 +816,31 @@ class Rankings:
     def get_championship_details(self, tid: str) -> pd.DataFrame:
         return self.championship_details_df.loc[self.championship_details_df.tid == tid].copy()
 
-    @staticmethod
-    def _count_unique_pids(df: pd.DataFrame, points_columns):
-        any_cat_participations = (df.loc[:, points_columns] > 0).any(axis="columns")
-        pid_count = df.loc[any_cat_participations, "pid"].nunique()
+    def _tid_statistics(self, tid: str) -> Dict[str, int]:
+        """Participations of tid in each category and in total, cached until tid changes.
+        Multi category players on a tournament are counted once in totals."""
+        stats = self._statistics.get(tid)
+        columns = self.cum_points_cat_columns() + self.points_cat_columns()
+        expected_names = {col.replace("points", "participation") for col in columns}
+        expected_names |= {"cum_participation_total", "participation_total"}
+        if stats is not None and set(stats) == expected_names:
+            return stats
+
+        tid_ranking = self._block(tid)
+        pids = tid_ranking["pid"].to_numpy()
+        stats = {}
+        for total_name, points_columns in (
+            ("cum_participation_total", self.cum_points_cat_columns()),
+            ("participation_total", self.points_cat_columns()),
+        ):
+            # players x categories participations
+            participated = tid_ranking.loc[:, points_columns].to_numpy(dtype=float) > 0
+            for points_col, n_participations in zip(points_columns, participated.sum(axis=0)):
+                stats[points_col.replace("points", "participation")] = int(n_participations)
+            stats[total_name] = len(pd.unique(pids[participated.any(axis=1)]))
+        self._statistics[tid] = stats
 
-        return pid_count
+        return stats
 
     def get_statistics(self, tid) -> pd.DataFrame:
         """
@@ -521,39 +851,17 @@ class Rankings:
         tid: ID of max tournament to consider
         """
         # TIDs to consider in statistic computation
-        tids_to_consider = self.ranking_df.tid <= tid
-
-        # stats by category
-        columns = ["tid"] + self.cum_points_cat_columns() + self.points_cat_columns()
-        stats_cat = (
-            self.ranking_df.loc[tids_to_consider, columns]
-            .groupby("tid")
-            .apply(lambda df: (df > 0).sum(axis=0), include_groups=False)
-            .rename(lambda col: col.replace("points", "participation"), axis="columns")
-        )
-
-        # total stats cumulated. multi category players on a tournament are counted once
-        columns = ["tid", "pid"] + self.cum_points_cat_columns()
-        cum_participation_total = (
-            self.ranking_df.loc[tids_to_consider, columns]
-            .groupby("tid")
-            .apply(self._count_unique_pids, self.cum_points_cat_columns(), include_groups=False)
-            .rename("cum_participation_total")
-        )
-
-        # total stats. multi category players on a tournament are counted once
-        columns = ["tid", "pid"] + self.points_cat_columns()
-        participation_total = (
-            self.ranking_df.loc[:, columns]
-            .groupby("tid")
-            .apply(self._count_unique_pids, self.points_cat_columns(), include_groups=False)
-            .rename("participation_total")
-        )
+        tids_list = self._get_tids_list()
+        tids_to_consider = [
+            tid_to_consider
+            for tid_to_consider in tids_list[: self._get_tid_ordinal(tid) + 1]
+            if tid_to_consider != self.cfg.initial_metadata.initial_tid
+        ]
 
-        # Join results in a single table
-        stats = stats_cat.join([participation_total, cum_participation_total]).sort_index(
-            axis="columns"
-        )
-        stats.drop(self.cfg.initial_metadata.initial_tid, inplace=True)
+        stats = pd.DataFrame(
+            [self._tid_statistics(tid_to_consider) for tid_to_consider in tids_to_consider],
+            index=pd.Index(tids_to_consider, name="tid"),
+            dtype="int64",
+        ).sort_index(axis="columns")
 
         return stats
@@ -0,0 +1,125 @@
+"""Compact dtypes of the DataFrames of models.
+
+Low cardinality strings are stored as categories (with sorted categories, so sorting is
+the same as with strings), names are interned, and integers are downcast when no value is
+missing. Ratings and points are kept as float64 because they are not exact in float32.
+"""
+
+import sys
+from typing import Dict, List
+
+import pandas as pd
+
+CATEGORY = "category"
+INTERNED = "interned"
+
+TOURNAMENTS_SCHEMA: Dict[str, str] = {
+    "sheet_name": CATEGORY,
+    "tournament_name": CATEGORY,
+    "year": "int16",
+    "location": CATEGORY,
+    "player_a": INTERNED,
+    "player_b": INTERNED,
+    "sets_a": "int8",
+    "sets_b": "int8",
+    "round": CATEGORY,
+    "category": CATEGORY,
+    "winner": INTERNED,
+    "winner_round": CATEGORY,
+    "loser": INTERNED,
+    "loser_round": CATEGORY,
+    "winner_pid": "int32",
+    "loser_pid": "int32",
+}
+
+RATING_DETAILS_SCHEMA: Dict[str, str] = {
+    **TOURNAMENTS_SCHEMA,
+    "winner_category": CATEGORY,
+    "loser_category": CATEGORY,
+}
+
+RANKING_SCHEMA: Dict[str, str] = {
+    "tournament_name": CATEGORY,
+    "location": CATEGORY,
+    "pid": "int32",
+}
+
+# Participations are counts, they are exact in float32
+PARTICIPATIONS_DTYPE = "float32"
+
+BEST_ROUNDS_SCHEMA: Dict[str, str] = {
+    "name": INTERNED,
+    "pid": "int32",
+    "category": CATEGORY,
+    "best_round": CATEGORY,
+}
+
+HISTORY_SCHEMA: Dict[str, str] = {
+    "pid": "int32",
+    "category": CATEGORY,
+    "best_round": CATEGORY,
+}
+
+CHAMPIONSHIP_DETAILS_SCHEMA: Dict[str, str] = {
+    **BEST_ROUNDS_SCHEMA,
+    "points": "int32",
+}
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """Return df with the dtypes of schema. Missing columns are ignored.
+
+    Integer dtypes are only applied to columns without missing values.
+    """
+    df = df.copy(deep=False)
+    dtypes = {}
+    for col, dtype in schema.items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if dtype == CATEGORY:
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                if values.cat.categories.is_monotonic_increasing:
+                    df[col] = values.cat.remove_unused_categories()
+                    continue
+                values = values.astype(object)
+            df[col] = values.astype(CATEGORY)
+        elif dtype == INTERNED:
+            if values.dtype == object:
+                df[col] = values.map(_intern)
+        elif values.dtype != dtype:
+            if pd.api.types.is_integer_dtype(dtype) and values.isna().any():
+                continue
+            dtypes[col] = dtype
+
+    return df.astype(dtypes) if dtypes else df
+
+
+def concat_with_schema(frames: List[pd.DataFrame], schema: Dict[str, str]) -> pd.DataFrame:
+    """Concatenate frames that already have the dtypes of schema, keeping those dtypes.
+
+    Categories of each categorical column are joined (and sorted) before concatenating, so
+    the column is not converted back to objects. Interned names are not interned again.
+    """
+    frames = [frame.copy(deep=False) for frame in frames]
+    for col, dtype in schema.items():
+        if dtype != CATEGORY or not all(
+            isinstance(frame[col].dtype, pd.CategoricalDtype) for frame in frames if col in frame
+        ):
+            continue
+        categories = pd.Index([], dtype=object)
+        for frame in frames:
+            if col in frame:
+                categories = categories.union(frame[col].cat.categories)
+        for frame in frames:
+            if col in frame:
+                frame[col] = frame[col].cat.set_categories(categories)
+
+    return apply_schema(
+        pd.concat(frames),
+        {col: dtype for col, dtype in schema.items() if dtype not in (CATEGORY, INTERNED)},
+    )
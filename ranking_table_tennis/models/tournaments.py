@@ -1,15 +1,26 @@
+import hashlib
 import logging
-from typing import Iterator, List
+import warnings
+from typing import Callable, Dict, Iterator, List, Tuple
 
+import numpy as np
 import pandas as pd
-from omegaconf import OmegaConf
-from unidecode import unidecode
 
+from ranking_table_tennis import normalize
 from ranking_table_tennis.configs import ConfigManager
 from ranking_table_tennis.models import Players
+from ranking_table_tennis.models.schema import (
+    BEST_ROUNDS_SCHEMA,
+    TOURNAMENTS_SCHEMA,
+    apply_schema,
+    concat_with_schema,
+)
 
 logger = logging.getLogger(__name__)
 
+# Kinds of rows, bonus, sanction and promote rows are workarounds to modify rankings
+MATCH_KINDS = ("real", "bonus", "sanction", "promote")
+
 
 class Tournaments:
     def __init__(self, tournaments_df: pd.DataFrame = None) -> None:
@@ -22,7 +33,16 @@ class Tournaments:
         :param tournaments_df: DataFrame with columns: tournament_name, date, location,
                player_a, player_b, sets_a, sets_b, round, category
         """
-        self.tournaments_df = pd.DataFrame(
+        self.tournaments_df = self._raw_frame(tournaments_df)
+
+        self.update_config()
+
+        self.verify_and_normalize()
+
+    @staticmethod
+    def _raw_frame(tournaments_df: pd.DataFrame | None) -> pd.DataFrame:
+        """Columns of tournaments_df to be normalized, with the columns to be computed."""
+        raw_df = pd.DataFrame(
             tournaments_df,
             columns=[
                 "tid",
@@ -48,28 +68,76 @@ class Tournaments:
             winner_pid=None,
             loser_pid=None,
         )
-        self.tournaments_df.insert(4, "year", None)
-
-        self.update_config()
+        raw_df.insert(4, "year", None)
+
+        return raw_df
+
+    def __setstate__(self, state: dict) -> None:
+        # Older pickles have no sheets pending to be concatenated
+        if "tournaments_df" in state:
+            state["_tournaments_df"] = state.pop("tournaments_df")
+        state.setdefault("_pending_sheets", [])
+        self.__dict__.update(state)
+        self.__dict__.setdefault("_best_rounds", None)
+        if "_tid_offsets" not in self.__dict__:
+            self._index_tids()
+        if "_participants_names" not in self.__dict__:
+            self._index_participants()
+        if "_next_index" not in self.__dict__:
+            self._next_index = self._get_next_index(self.tournaments_df)
+        # Pids of older pickles are assigned again
+        self.__dict__.setdefault("_pids_version", None)
+        self.__dict__.setdefault("_assigned_name2pid", None)
+
+    @property
+    def tournaments_df(self) -> pd.DataFrame:
+        """Matches of all tournaments, sheets appended since last access are concatenated
+        (and the kinds of their matches)."""
+        if self._pending_sheets:
+            self._tournaments_df = concat_with_schema(
+                [self._tournaments_df, *self._pending_sheets], TOURNAMENTS_SCHEMA
+            )
+            self._match_kinds = np.concatenate(
+                [self._match_kinds, *map(self._get_match_kinds, self._pending_sheets)]
+            )
+            self._pending_sheets = []
+        return self._tournaments_df
 
-        self.verify_and_normalize()
+    @tournaments_df.setter
+    def tournaments_df(self, tournaments_df: pd.DataFrame) -> None:
+        self._tournaments_df = tournaments_df
+        self._pending_sheets: List[pd.DataFrame] = []
 
     def __len__(self) -> int:
-        return len(self.tournaments_df)
+        return len(self._tournaments_df) + sum(len(sheet_df) for sheet_df in self._pending_sheets)
 
     def __str__(self) -> str:
         return str(self.tournaments_df)
 
     def __iter__(self) -> Iterator[str]:
-        grouped = self.tournaments_df.groupby("tid").groups.keys()
-        return iter(grouped)
+        return iter(self._tid_ordinals)
 
     def __getitem__(self, tid: str) -> pd.DataFrame:
-        criteria = self.tournaments_df.tid == tid
-        return self.tournaments_df.loc[criteria].copy()
+        """Rows of tid, a slice of tournaments_df. Use .copy() on it to modify it."""
+        start, stop = self._tid_offsets.get(tid, (0, 0))
+        # Rows of a sheet appended since last access are read from the sheet
+        sheet_start = len(self._tournaments_df)
+        for sheet_df in self._pending_sheets:
+            if sheet_start <= start and stop <= sheet_start + len(sheet_df):
+                return sheet_df.iloc[start - sheet_start : stop - sheet_start]
+            sheet_start += len(sheet_df)
+        return self.tournaments_df.iloc[start:stop]
+
+    def fingerprint(self, tid: str) -> str:
+        """Hash of the matches of tid, including pids assigned to players."""
+        hashed_rows = pd.util.hash_pandas_object(self[tid], index=False)
+        return hashlib.sha256(hashed_rows.to_numpy().tobytes()).hexdigest()
 
     def update_config(self):
         self.cfg = ConfigManager().current_config
+        self.rules = ConfigManager().current_rules
+        # Best rounds depend on round priorities of config
+        self._best_rounds: pd.DataFrame | None = None
 
     def _batch_process_matches(self, matches: pd.DataFrame) -> pd.DataFrame:
         # workaround to add extra bonus points from match list
@@ -118,28 +186,49 @@ class Tournaments:
 
     @staticmethod
     def tid_str(year_grp):
-        tids = year_grp["date"].dt.strftime("S%Y").rename("tid")
-        dates_ordered = sorted(year_grp["date"].unique())
-        for num, date in enumerate(dates_ordered, 1):
-            filtered_rows = year_grp["date"] == date
-            tids.loc[filtered_rows] += "T%02d" % num
+        return normalize.dense_rank_tids(year_grp["date"])
 
-        return tids
+    @staticmethod
+    def tid_ordinals(tids: pd.Series) -> Dict[str, int]:
+        """Dense ordinal of each tid, in chronological order starting from 1.
+
+        Ordinal 0 is left for the initial ranking, so ordinals are positions on lists of tids
+        that start with the initial tid.
+        """
+        return {tid: num for num, tid in enumerate(sorted(tids.unique()), 1)}
+
+    def get_ordinal(self, tid: str) -> int:
+        """Return the ordinal of tid, 0 for the initial tid."""
+        if tid == self.cfg.initial_metadata.initial_tid:
+            return 0
+        return self._tid_ordinals[tid]
+
+    def get_ordinals(self, tids: pd.Series) -> pd.Series:
+        """Return the ordinals of tids, 0 for the initial tid."""
+        ordinals = {self.cfg.initial_metadata.initial_tid: 0, **self._tid_ordinals}
+        return tids.map(ordinals).astype(int)
 
     def verify_and_normalize(self) -> None:
-        self.tournaments_df = (
-            self.tournaments_df.assign(
+        self.tournaments_df = self._normalize(self.tournaments_df, self.tid_str)
+        self._index_tids()
+
+    def _normalize(
+        self, tournaments_df: pd.DataFrame, tid_str: Callable[[pd.DataFrame], pd.Series]
+    ) -> pd.DataFrame:
+        """Normalized and processed matches of tournaments_df, tids are given by tid_str."""
+        return (
+            tournaments_df.assign(
                 # Columns to lower
-                round=lambda df: df["round"].str.strip().str.lower(),
-                category=lambda df: df.category.str.strip().str.lower(),
+                round=lambda df: normalize.normalize_labels(df["round"]),
+                category=lambda df: normalize.normalize_labels(df.category),
                 # Columns to title
-                tournament_name=lambda df: df.tournament_name.str.strip().str.title(),
-                date=lambda df: pd.to_datetime(df.date.str.strip().str.title()),
-                location=lambda df: df.location.str.strip().str.title(),
-                player_a=lambda df: df.player_a.apply(unidecode).str.strip().str.title(),
-                player_b=lambda df: df.player_b.apply(unidecode).str.strip().str.title(),
+                tournament_name=lambda df: normalize.normalize_labels(df.tournament_name, "title"),
+                date=lambda df: normalize.parse_dates(df.date),
+                location=lambda df: normalize.normalize_labels(df.location, "title"),
+                player_a=lambda df: normalize.normalize_names(df.player_a),
+                player_b=lambda df: normalize.normalize_names(df.player_b),
                 year=lambda df: df.date.dt.year.astype(int),
-                tid=lambda df: self.tid_str(df),
+                tid=tid_str,
             )
             .astype(
                 {
@@ -152,7 +241,172 @@ class Tournaments:
                 }
             )
             .pipe(self._batch_process_matches)
+            .pipe(apply_schema, TOURNAMENTS_SCHEMA)
+        )
+
+    def append_sheet(self, raw_sheet_df: pd.DataFrame) -> None:
+        """Append the matches of a tournament sheet, with the columns given on creation.
+
+        Only the new rows are normalized and indexed. Tids of existing tournaments are kept,
+        and the new tournament gets the next tid, the one it would get if all sheets were
+        loaded again. So sheets must be appended in chronological order.
+
+        Pids of new rows are assigned from the players of the last assignment, if any.
+        """
+        sheet_df = self._raw_frame(raw_sheet_df)
+        if sheet_df.empty:
+            return
+        sheet_df.index = pd.RangeIndex(self._next_index, self._next_index + len(sheet_df))
+        sheet_df = self._normalize(sheet_df, self._next_tids)
+        if not sheet_df["tid"].is_monotonic_increasing:
+            sheet_df = sheet_df.sort_values("tid", kind="stable")
+        if self._assigned_name2pid is not None:
+            sheet_df = apply_schema(
+                sheet_df.assign(
+                    winner_pid=sheet_df["winner"].map(self._assigned_name2pid),
+                    loser_pid=sheet_df["loser"].map(self._assigned_name2pid),
+                ),
+                TOURNAMENTS_SCHEMA,
+            )
+
+        # Sheets are concatenated on the next access to tournaments_df
+        first_row = len(self)
+        self._pending_sheets.append(sheet_df)
+        self._next_index += len(sheet_df)
+        for tid, (start, stop) in self._tid_offsets_of(sheet_df["tid"], first_row).items():
+            # Rows of a known tid (same date as the last one) are contiguous to its rows
+            if tid in self._tid_offsets:
+                start = self._tid_offsets[tid][0]
+            self._tid_offsets[tid] = (start, stop)
+            self._tid_ordinals.setdefault(tid, len(self._tid_ordinals) + 1)
+        for participants, cols in [
+            (self._participants_names, ("winner", "loser")),
+            (self._participants_pids, ("winner_pid", "loser_pid")),
+        ]:
+            for key, players in self._participants_index(*cols, sheet_df).items():
+                if key in participants:
+                    players = np.union1d(participants[key], players)
+                participants[key] = players
+        self._best_rounds = None
+
+    def _next_tids(self, sheet_df: pd.DataFrame) -> pd.Series:
+        """Tids of dates of sheet_df that follow the tids of known tournaments."""
+        if not len(self):
+            return self.tid_str(sheet_df)
+
+        last_tid = next(reversed(self._tid_offsets))
+        last_sheet_df = (self._pending_sheets or [self._tournaments_df])[-1]
+        last_date = last_sheet_df["date"].iat[-1]
+        dates = sheet_df["date"]
+        if (dates < last_date).any():
+            logger.error(
+                "Failed to append sheet, it is dated before '%s' (%s):\n%s",
+                last_tid,
+                last_date.date(),
+                sheet_df[dates < last_date],
+            )
+            raise ValueError(f"Sheets must be appended after '{last_tid}'")
+
+        tids = pd.Series(last_tid, index=dates.index, name="tid", dtype=object)
+        later = dates > last_date
+        tids[later] = normalize.dense_rank_tids(dates[later], len(self._tid_ordinals) + 1)
+
+        return tids
+
+    def _index_tids(self) -> None:
+        """Sort rows by tid (keeping the order of each tournament) and index them.
+
+        Rows of each tid are at (start, stop) offsets, and the kind of each row is coded as
+        its position in MATCH_KINDS.
+        """
+        if not self.tournaments_df["tid"].is_monotonic_increasing:
+            self.tournaments_df = self.tournaments_df.sort_values("tid", kind="stable")
+        self._tid_offsets: Dict[str, Tuple[int, int]] = self._tid_offsets_of(
+            self.tournaments_df["tid"]
         )
+        self._tid_ordinals = self.tid_ordinals(self.tournaments_df["tid"])
+        self._match_kinds = self._get_match_kinds(self.tournaments_df)
+        self._index_participants()
+        self._next_index = self._get_next_index(self.tournaments_df)
+        # Version of players used to assign pids, and the names assigned
+        self._pids_version: str | None = None
+        self._assigned_name2pid: Dict[str, int] | None = None
+
+    @staticmethod
+    def _get_next_index(tournaments_df: pd.DataFrame) -> int:
+        """Index label of the next row appended to tournaments_df."""
+        return int(tournaments_df.index.max()) + 1 if len(tournaments_df) else 0
+
+    @staticmethod
+    def _tid_offsets_of(tids: pd.Series, first_row: int = 0) -> Dict[str, Tuple[int, int]]:
+        """(start, stop) offsets of the rows of each tid (sorted), starting at first_row."""
+        tids = tids.to_numpy()
+        if not len(tids):
+            return {}
+        starts = np.flatnonzero(np.r_[True, tids[1:] != tids[:-1]])
+        stops = np.r_[starts[1:], len(tids)]
+
+        return {
+            tids[start]: (first_row + start, first_row + stop) for start, stop in zip(starts, stops)
+        }
+
+    def _index_participants(self) -> None:
+        """Sorted names and pids of the players of each tid, and of each tid and category."""
+        self._participants_names = self._participants_index("winner", "loser")
+        self._participants_pids = self._participants_index("winner_pid", "loser_pid")
+
+    def _participants_index(
+        self, winner_col: str, loser_col: str, tournaments_df: pd.DataFrame | None = None
+    ) -> Dict:
+        """Sorted unique values of players (missing ones are excluded) keyed by tid and by
+        (tid, category), of all tournaments unless tournaments_df is given."""
+        if tournaments_df is None:
+            tournaments_df = self.tournaments_df
+        participants = (
+            pd.DataFrame(
+                {
+                    "tid": np.tile(tournaments_df["tid"].to_numpy(), 2),
+                    "category": np.tile(tournaments_df["category"].to_numpy(dtype=object), 2),
+                    "player": np.concatenate(
+                        [
+                            tournaments_df[winner_col].to_numpy(),
+                            tournaments_df[loser_col].to_numpy(),
+                        ]
+                    ),
+                }
+            )
+            .dropna(subset="player")
+            .drop_duplicates()
+            .sort_values(["tid", "player"])
+        )
+        if winner_col.endswith("_pid"):
+            participants["player"] = participants["player"].astype(int)
+
+        index: Dict = {
+            tid: tid_players.unique()
+            for tid, tid_players in participants.groupby("tid", sort=False)["player"]
+        }
+        index.update(
+            {
+                key: category_players.to_numpy()
+                for key, category_players in participants.groupby(["tid", "category"], sort=False)[
+                    "player"
+                ]
+            }
+        )
+        return index
+
+    @staticmethod
+    def _get_match_kinds(tournaments_df: pd.DataFrame) -> np.ndarray:
+        return np.select(
+            [tournaments_df[kind].to_numpy(dtype=bool) for kind in MATCH_KINDS[1:]],
+            range(1, len(MATCH_KINDS)),
+            default=0,
+        ).astype(np.int8)
+
+    @staticmethod
+    def _kind_codes(kinds: List[str]) -> List[int]:
+        return [MATCH_KINDS.index(kind) for kind in kinds]
 
     def get_players_names(self, tid: str, category: str = "") -> List[str]:
         """
@@ -160,41 +414,49 @@ class Tournaments:
 
         If category is given, the list of players is filtered by category
         """
-        criteria = self.tournaments_df.tid == tid
-        if category:
-            criteria = criteria & (self.tournaments_df.category == category)
-
-        winner = self.tournaments_df.loc[criteria, "winner"]
-        loser = self.tournaments_df.loc[criteria, "loser"]
-        all_players = pd.concat([winner, loser], ignore_index=True).unique()
-
-        return sorted(list(all_players))
+        key = (tid, category) if category else tid
+        return self._participants_names.get(key, np.empty(0, dtype=object)).tolist()
 
     def get_players_pids(self, tid: str, category: str = "") -> List[int]:
         """
-        Return a list of pid players that played the tournament
+        Return a sorted list of pid players that played the tournament
 
+        Players without pid (unknown players, or all of them before assign_pid_from_players)
+        are left out instead of being listed as NaN, get_players_names still lists them.
         If category is given, the list of players is filtered by category
         """
-        criteria = self.tournaments_df.tid == tid
-        if category:
-            criteria = criteria & (self.tournaments_df.category == category)
+        key = (tid, category) if category else tid
+        return self._participants_pids.get(key, np.empty(0, dtype=int)).tolist()
 
-        winner = self.tournaments_df.loc[criteria, "winner_pid"]
-        loser = self.tournaments_df.loc[criteria, "loser_pid"]
-        all_players = pd.concat([winner, loser], ignore_index=True).unique()
+    def compute_best_rounds(self, tid: str, players: Players | None = None) -> pd.DataFrame:
+        """
+        Return a DataFrame with the best round for each player and category of tid.
 
-        return sorted(list(all_players))
+        pid is the one assigned by assign_pid_from_players. players is deprecated and ignored.
+        """
+        if players is not None:
+            warnings.warn(
+                "players is ignored by compute_best_rounds, pids come from assign_pid_from_players",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+        best_rounds = self.compute_all_best_rounds()
+        tid_rows = self._best_rounds_rows.get(tid, np.empty(0, dtype=np.intp))
 
-    def compute_best_rounds(self, tid: str, players: Players) -> pd.DataFrame:
+        return best_rounds.iloc[tid_rows].drop(columns="tid").reset_index(drop=True)
+
+    def compute_all_best_rounds(self) -> pd.DataFrame:
         """
-        Return a DataFrame with the best round for each player and category.
+        Return a DataFrame with the best round for each tournament, player and category.
 
-        pid is assigned from players
+        Best rounds of all tournaments are computed at once and cached until pids are assigned
+        again or config is updated.
         """
-        matches = self.get_matches(
-            tid, exclude_fan_category=False, to_exclude=["sanction", "promote"]
-        )
+        if self._best_rounds is not None:
+            return self._best_rounds
+
+        to_exclude = self._kind_codes(["sanction", "promote"])
+        matches = self.tournaments_df[~np.isin(self._match_kinds, to_exclude)]
 
         # Filter matches to process so best rounds can be computed
         translations = {
@@ -205,41 +467,122 @@ class Tournaments:
             "winner_round": "best_round",
             "loser_round": "best_round",
         }
-        winner_data = matches.loc[:, ["winner", "winner_pid", "category", "winner_round"]].rename(
-            columns=translations
-        )
-        loser_data = matches.loc[:, ["loser", "loser_pid", "category", "loser_round"]].rename(
-            columns=translations
-        )
+        winner_data = matches.loc[
+            :, ["tid", "winner", "winner_pid", "category", "winner_round"]
+        ].rename(columns=translations)
+        loser_data = matches.loc[
+            :, ["tid", "loser", "loser_pid", "category", "loser_round"]
+        ].rename(columns=translations)
         rounds_data = pd.concat([winner_data, loser_data], ignore_index=True)
 
-        # Assign priority to matches
-        rounds_data["round_priority"] = rounds_data.loc[:, "best_round"].map(
-            OmegaConf.to_container(self.cfg.best_rounds_priority, resolve=True)
+        # Assign priority to matches, unknown rounds have no priority
+        rounds_data["round_priority"] = (
+            rounds_data["best_round"].astype(object).astype(self.rules.round_order)
         )
 
-        # Get best one for each player and category
-        rounds_data.sort_values(by="round_priority", ascending=False, inplace=True)
+        # Get best one for each tournament, player and category
+        # Stable sort, so ties keep the order of matches of each tournament
+        rounds_data.sort_values(by="round_priority", ascending=False, kind="stable", inplace=True)
         best_rounds = (
-            rounds_data.groupby(by=["category", "pid"]).head(1).drop(columns="round_priority")
+            rounds_data.groupby(by=["tid", "category", "pid"], observed=True)
+            .head(1)
+            .drop(columns="round_priority")
         )
-        best_rounds = best_rounds.sort_values(by=["category", "pid"]).reset_index(drop=True)
+        best_rounds = (
+            best_rounds.sort_values(by=["tid", "category", "pid"])
+            .reset_index(drop=True)
+            .pipe(apply_schema, BEST_ROUNDS_SCHEMA)
+        )
+
+        self._best_rounds = best_rounds
+        self._best_rounds_rows = best_rounds.groupby("tid", sort=False).indices
 
         return best_rounds
 
     def assign_pid_from_players(self, players: Players) -> None:
+        """Assign pids of winners and losers from players.
+
+        Pids are stamped with the version of the names of players (see Players.names_version),
+        nothing is done if players did not change. Otherwise only rows with names whose pid
+        changed since the last assignment are mapped again.
+        """
+        names_version = players.names_version
+        if names_version == self._pids_version:
+            return
+
         name2pid = players.get_name2pid()
-        self.tournaments_df["winner_pid"] = self.tournaments_df["winner"].map(name2pid)
-        self.tournaments_df["loser_pid"] = self.tournaments_df["loser"].map(name2pid)
+        new_name2pid = name2pid.to_dict()
+        if self._assigned_name2pid is None:
+            self.tournaments_df = apply_schema(
+                self.tournaments_df.assign(
+                    winner_pid=self.tournaments_df["winner"].map(name2pid),
+                    loser_pid=self.tournaments_df["loser"].map(name2pid),
+                ),
+                TOURNAMENTS_SCHEMA,
+            )
+            self._participants_pids = self._participants_index("winner_pid", "loser_pid")
+            self._best_rounds = None
+        else:
+            changed_names = [
+                name
+                for name in new_name2pid.keys() | self._assigned_name2pid.keys()
+                if new_name2pid.get(name) != self._assigned_name2pid.get(name)
+            ]
+            rows = np.flatnonzero(
+                self.tournaments_df["winner"].isin(changed_names)
+                | self.tournaments_df["loser"].isin(changed_names)
+            )
+            if len(rows):
+                self._assign_pids_of_rows(rows, name2pid)
+
+        self._pids_version = names_version
+        self._assigned_name2pid = new_name2pid
+
+    def _assign_pids_of_rows(self, rows: np.ndarray, name2pid: pd.Series) -> None:
+        """Write pids of rows (positions) in place and index participants of their tids again."""
+        for col in ("winner", "loser"):
+            pid_col = f"{col}_pid"
+            pids = self.tournaments_df[col].iloc[rows].map(name2pid).to_numpy(dtype=float)
+            # Pids are integers, but they are missing for unknown names
+            if np.isnan(pids).any() and pd.api.types.is_integer_dtype(
+                self.tournaments_df[pid_col].dtype
+            ):
+                self.tournaments_df[pid_col] = self.tournaments_df[pid_col].astype(float)
+            pid_dtype = self.tournaments_df[pid_col].dtype
+            self.tournaments_df.iloc[rows, self.tournaments_df.columns.get_loc(pid_col)] = (
+                pids.astype(pid_dtype)
+            )
+            if (
+                pd.api.types.is_float_dtype(pid_dtype)
+                and not self.tournaments_df[pid_col].isna().any()
+            ):
+                self.tournaments_df[pid_col] = self.tournaments_df[pid_col].astype(
+                    TOURNAMENTS_SCHEMA[pid_col]
+                )
+
+        tids = pd.unique(self.tournaments_df["tid"].to_numpy()[rows])
+        tids_df = self.tournaments_df.iloc[
+            np.concatenate([np.arange(*self._tid_offsets[tid]) for tid in tids])
+        ]
+        # Keys of participants without pids are not indexed again
+        for tid, category in (
+            tids_df.loc[:, ["tid", "category"]].drop_duplicates().itertuples(index=False)
+        ):
+            self._participants_pids.pop(tid, None)
+            self._participants_pids.pop((tid, category), None)
+        self._participants_pids.update(self._participants_index("winner_pid", "loser_pid", tids_df))
+        self._best_rounds = None
 
     def get_matches(
         self, tid: str, exclude_fan_category: bool = True, to_exclude: List[str] | None = None
     ) -> pd.DataFrame:
+        """Matches of tid, but the kinds (see MATCH_KINDS) to exclude and fan category ones."""
         if to_exclude is None:
             to_exclude = ["sanction", "promote", "bonus"]
-        entries_indexes = self.tournaments_df.loc[:, "tid"] == tid
+        start, stop = self._tid_offsets.get(tid, (0, 0))
+        tournament_df = self.tournaments_df.iloc[start:stop]
+        entries_indexes = ~np.isin(self._match_kinds[start:stop], self._kind_codes(to_exclude))
         if exclude_fan_category:
-            entries_indexes &= ~(self.tournaments_df.loc[:, "category"] == self.cfg.categories[-1])
-        entries_indexes &= ~self.tournaments_df.loc[:, to_exclude].any(axis="columns")
+            entries_indexes &= (tournament_df["category"] != self.cfg.categories[-1]).to_numpy()
 
-        return self.tournaments_df[entries_indexes]
+        return tournament_df[entries_indexes]
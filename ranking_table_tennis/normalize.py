@@ -0,0 +1,136 @@
+"""Normalization of the strings of tournaments and players.
+
+Values repeat a lot (a player is named in every match played), so unique values are
+normalized once and mapped back to every row, and canonical names are memoized.
+"""
+
+import logging
+import os
+import pickle
+from collections import OrderedDict
+from typing import Callable, Tuple
+
+import numpy as np
+import pandas as pd
+from unidecode import unidecode
+
+logger = logging.getLogger(__name__)
+
+# Formats of dates in the tournaments sheets, other dates (e.g. 03/04/2023, ambiguous) are
+# inferred by pandas as before, so they are parsed month first
+DATE_FORMATS: Tuple[str, ...] = ("%Y-%m-%d", "%Y %m %d")
+
+
+class NameCache:
+    """Bounded memo of canonical names, the least recently used ones are dropped first.
+
+    It can be saved into a file and loaded in the next run.
+    """
+
+    def __init__(self, maxsize: int = 100_000) -> None:
+        self.maxsize = maxsize
+        self._names: OrderedDict[str, str] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __call__(self, name: str) -> str:
+        """Canonical name: transliterated to ascii, stripped and titled."""
+        canonical = self._names.get(name)
+        if canonical is None:
+            canonical = unidecode(name).strip().title()
+            self._names[name] = canonical
+            if len(self._names) > self.maxsize:
+                self._names.popitem(last=False)
+        else:
+            self._names.move_to_end(name)
+
+        return canonical
+
+    def load(self, filename: str) -> None:
+        """Add names saved in filename, if it exists."""
+        if not os.path.exists(filename):
+            return
+        try:
+            with open(filename, "rb") as fo:
+                names = pickle.load(fo)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            logger.warning("Names cache '%s' could not be loaded, it is ignored", filename)
+            return
+        for name, canonical in names.items():
+            self._names.setdefault(name, canonical)
+        while len(self._names) > self.maxsize:
+            self._names.popitem(last=False)
+
+    def save(self, filename: str) -> None:
+        """Save names into filename. It is replaced at once, so a process loading it never
+        reads a partial file."""
+        temp_filename = f"{filename}.{os.getpid()}.tmp"
+        with open(temp_filename, "wb") as fo:
+            pickle.dump(dict(self._names), fo, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_filename, filename)
+
+
+# Shared by tournaments, players and live matches
+names_cache = NameCache()
+
+
+def canonical_name(name: str) -> str:
+    """Canonical form of a name, e.g. ' pérez, juan ' is 'Perez, Juan'."""
+    return names_cache(name)
+
+
+def map_uniques(values: pd.Series, func: Callable[[str], str]) -> pd.Series:
+    """Apply func to each unique value of values and map results back to every row.
+
+    Missing values are kept.
+    """
+    codes, uniques = pd.factorize(values)
+    mapped = np.array([func(value) for value in uniques] + [np.nan], dtype=object)
+
+    return pd.Series(mapped[codes], index=values.index, name=values.name)
+
+
+def normalize_names(values: pd.Series) -> pd.Series:
+    """Canonical names of values, see canonical_name."""
+    return map_uniques(values, canonical_name)
+
+
+def normalize_labels(values: pd.Series, case: str = "lower") -> pd.Series:
+    """Stripped values in lower (or title) case, as rounds and categories (or locations).
+    Values that are not strings are missing."""
+    return map_uniques(
+        values, lambda value: getattr(value.strip(), case)() if isinstance(value, str) else np.nan
+    )
+
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Parse dates of values with the known DATE_FORMATS, one unique date at a time.
+
+    Dates that do not match any format are parsed as pandas would infer them.
+    """
+    codes, uniques = pd.factorize(values.str.strip())
+    uniques = pd.Index(uniques)
+    dates = pd.Series(pd.NaT, index=range(len(uniques)), dtype="datetime64[ns]")
+    for date_format in DATE_FORMATS:
+        missing = dates.isna().to_numpy()
+        if not missing.any():
+            break
+        dates[missing] = pd.to_datetime(uniques[missing], format=date_format, errors="coerce")
+    missing = dates.isna().to_numpy()
+    if missing.any():
+        dates[missing] = pd.to_datetime(uniques[missing].str.title())
+
+    parsed = np.append(dates.to_numpy(), np.datetime64("NaT"))[codes]
+    return pd.Series(parsed, index=values.index, name=values.name)
+
+
+def dense_rank_tids(dates: pd.Series, start: int = 1) -> pd.Series:
+    """Tids of dates, S<year>T<number> where dates are numbered in order from start (1 by
+    default), e.g. S2022T03 for the third date."""
+    unique_dates = pd.DatetimeIndex(np.sort(dates.unique()))
+    tids = np.array(
+        [f"S{date.year}T{num:02d}" for num, date in enumerate(unique_dates, start)], dtype=object
+    )
+
+    return pd.Series(tids[unique_dates.get_indexer(dates)], index=dates.index, name="tid")
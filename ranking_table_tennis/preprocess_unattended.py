@@ -7,7 +7,7 @@ from ranking_table_tennis.configs import ConfigManager
 logger = logging.getLogger(__name__)
 
 
-def main(config_initial_date="220101", download=True):
+def main(config_initial_date="220101", download=True, check_updates=True):
     """Preprocess matches on xlsx tournaments database. Resolves with no human interaction
 
     Function to run before compute_rankings.main().
@@ -19,6 +19,7 @@ def main(config_initial_date="220101", download=True):
     It will ask for information not given and saves the result into the same xlsx
 
     If offline=True it will execute preprocessing locally (not retrieving or uploading updates).
+    If check_updates=True it will stop if the spreadsheet was not updated recently.
     """
     logger.info("Starting preprocess unattended!")
 
@@ -26,7 +27,8 @@ def main(config_initial_date="220101", download=True):
     cfg = ConfigManager().current_config
 
     # Stop preprocess if there were no recent updates on the spreadsheet
-    helpers.no_updates_stop_workflow(cfg.io.tournaments_spreadsheet_id)
+    if check_updates:
+        helpers.no_updates_stop_workflow(cfg.io.tournaments_spreadsheet_id)
 
     if download:
         xlsx_file = cfg.io.data_folder + cfg.io.xlsx.tournaments_filename
@@ -0,0 +1,364 @@
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from ranking_table_tennis import helpers, models
+from ranking_table_tennis.configs import CompiledRules, ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# Simulations are computed in chunks to bound the memory of points arrays
+CHUNK_SIMULATIONS = 1000
+
+
+@dataclass
+class Season:
+    """State of a season after its last computed tournament, as arrays aligned to pids.
+
+    points are the category points (categories x pids x tournaments) of computed tournaments.
+    round_codes are the codes of the rounds reached by the champion, the finalist, the
+    semifinalists, and so on. Players eliminated before are in the group stage (last code).
+    """
+
+    pids: np.ndarray
+    names: np.ndarray
+    ratings: np.ndarray
+    participation_prob: np.ndarray
+    points: np.ndarray
+    rules: CompiledRules
+    round_codes: np.ndarray
+    n_best_tournaments: int
+    scale: float
+
+
+def fit_scale(rating_details: pd.DataFrame) -> float:
+    """Scale of the logistic probability to win a match given the rating difference.
+
+    P(win) = 1 / (1 + 10 ** (-difference / scale)), where scale maximizes the likelihood of
+    the results of given matches.
+    """
+    diff = (rating_details["winner_rating"] - rating_details["loser_rating"]).to_numpy(float)
+    diff = diff[~np.isnan(diff)]
+    if len(diff) == 0:
+        return 400.0
+
+    scales = np.geomspace(25, 5000, 200)
+    log_likelihood = -np.logaddexp(0, -np.log(10) * diff[:, np.newaxis] / scales).sum(axis=0)
+
+    return float(scales[log_likelihood.argmax()])
+
+
+def load_season(
+    tournaments: models.Tournaments, players: models.Players, rankings: models.Rankings, tid: str
+) -> Season:
+    """Season state at tid, tournaments of the season up to tid must be computed."""
+    cfg = rankings.cfg
+    computed_tids = list(tournaments)[: tournaments.get_ordinal(tid)]
+    if not computed_tids:
+        raise ValueError("At least a computed tournament is required to project the season")
+
+    ranking = rankings[tid]
+    pids = ranking["pid"].to_numpy()
+    names = players.players_df["name"].reindex(pids).fillna("").to_numpy(dtype=object)
+
+    # Players keep playing as often as they have played this season
+    participation_prob = players.participation_matrix(pids, computed_tids).mean(axis=1)
+
+    points = np.zeros((len(cfg.categories), len(pids), len(computed_tids)), dtype=np.float32)
+    for num, computed_tid in enumerate(computed_tids):
+        computed_ranking = rankings[computed_tid].set_index("pid")
+        points[:, :, num] = (
+            computed_ranking.loc[:, rankings.points_cat_columns()].reindex(pids).fillna(0).T
+        )
+
+    rounds = cfg.roundnames
+    round_names = [
+        rounds.champion,
+        rounds.second,
+        rounds.semifinal,
+        rounds.quarterfinal,
+        rounds.round_of_16,
+        rounds.round_of_32,
+        rounds.group_stage,
+    ]
+    round_codes = rankings.rules.round_codes(round_names)
+    if (round_codes < 0).any():
+        missing = [name for name, code in zip(round_names, round_codes) if code < 0]
+        raise ValueError(f"Rounds without points to assign: {missing}")
+
+    return Season(
+        pids=pids,
+        names=names,
+        ratings=ranking["rating"].to_numpy(dtype=float),
+        participation_prob=participation_prob,
+        points=points,
+        rules=rankings.rules,
+        round_codes=round_codes,
+        n_best_tournaments=cfg.compute.masters_N_tournaments_to_consider,
+        scale=fit_scale(rankings.rating_details_df),
+    )
+
+
+def _bit_reversed(n_bits: int) -> np.ndarray:
+    """Slots of a bracket of 2**n_bits players, so the first players never meet each other
+    before the last rounds and byes are spread."""
+    positions = np.arange(2**n_bits)
+    reversed_positions = np.zeros_like(positions)
+    for bit in range(n_bits):
+        reversed_positions |= ((positions >> bit) & 1) << (n_bits - 1 - bit)
+    return reversed_positions
+
+
+def _play_knockout(
+    season: Season,
+    playing: np.ndarray,
+    ratings: np.ndarray,
+    rating_changes: np.ndarray,
+    best_round: np.ndarray,
+    rng: np.random.Generator,
+) -> None:
+    """Play a single elimination bracket of playing players (simulations x pids) with random
+    draws. Rating changes and codes of best rounds are updated inplace."""
+    n_players = playing.sum(axis=1)
+    if n_players.max() == 0:
+        return
+    n_rounds = int(np.ceil(np.log2(max(n_players.max(), 2))))
+    n_slots = 2**n_rounds
+    sims = np.arange(len(playing))[:, np.newaxis]
+
+    # Random draw, players are placed in the first slots of the bracket
+    draw = np.argsort(np.where(playing, rng.random(playing.shape), 2.0), axis=1)
+    n_drawn = min(n_slots, playing.shape[1])
+    drawn = np.arange(n_drawn) < n_players[:, np.newaxis]
+    slots = np.full((len(playing), n_slots), -1)
+    slots[:, _bit_reversed(n_rounds)[:n_drawn]] = np.where(drawn, draw[:, :n_drawn], -1)
+
+    rating_factor = season.rules.rating_factor
+    for n_round in range(n_rounds):
+        left, right = slots[:, 0::2], slots[:, 1::2]
+        matches = (left >= 0) & (right >= 0)
+        left_rating, right_rating = ratings[sims, left], ratings[sims, right]
+        left_wins = rng.random(left.shape) < 1 / (
+            1 + 10 ** (-(left_rating - right_rating) / season.scale)
+        )
+        winner = np.where((left >= 0) & ~(matches & ~left_wins), left, right)
+        loser = np.where(left_wins, right, left)
+
+        # Matches are played with ratings previous to the tournament, as in Rankings
+        match_sims, _ = np.nonzero(matches)
+        winners, losers = winner[matches], loser[matches]
+        to_winner, to_loser = season.rules.points_to_assign(
+            ratings[match_sims, winners] - ratings[match_sims, losers]
+        )
+        np.add.at(rating_changes, (match_sims, winners), rating_factor * to_winner)
+        np.add.at(rating_changes, (match_sims, losers), -rating_factor * to_loser)
+
+        rounds_to_final = n_rounds - 1 - n_round
+        round_code = season.round_codes[min(rounds_to_final + 1, len(season.round_codes) - 1)]
+        best_round[match_sims, losers] = round_code
+        slots = winner
+
+    champions = slots[:, 0]
+    with_champion = champions >= 0
+    best_round[np.flatnonzero(with_champion), champions[with_champion]] = season.round_codes[0]
+
+
+def simulate(season: Season, n_tournaments: int, n_simulations: int, seed=None) -> dict:
+    """Simulate the remaining n_tournaments of the season n_simulations times.
+
+    Each category is played as a single elimination bracket. Players play their category
+    (given by their rating) with the probability they have played the season, and they
+    win matches with a logistic probability of the rating difference.
+
+    Returns final ratings and categories (simulations x pids), and the champions and podiums
+    (simulations x categories) with the championship points summed over simulations.
+    """
+    rng = np.random.default_rng(seed)
+    rules = season.rules
+    n_categories, n_pids, n_computed = season.points.shape
+
+    ratings = np.tile(season.ratings, (n_simulations, 1))
+    points = np.zeros((n_categories, n_simulations, n_pids, n_tournaments), dtype=np.float32)
+    for n_tournament in range(n_tournaments):
+        categories = rules.rating_category_codes(ratings)
+        playing = rng.random(ratings.shape) < season.participation_prob
+        rating_changes = np.zeros_like(ratings)
+        best_round = np.full(ratings.shape, -1)
+        # Fan category is not assigned by rating
+        for category in range(n_categories - 1):
+            _play_knockout(
+                season, playing & (categories == category), ratings, rating_changes, best_round, rng
+            )
+
+        sims, pids = np.nonzero(best_round >= 0)
+        player_categories = categories[sims, pids]
+        points[player_categories, sims, pids, n_tournament] = rules.best_rounds_points[
+            player_categories, best_round[sims, pids]
+        ]
+        ratings += rating_changes
+
+    champions = np.full((n_simulations, n_categories), -1)
+    podiums = np.full((n_simulations, n_categories, 3), -1)
+    championship_points = np.zeros((n_categories, n_pids))
+    for category in range(n_categories):
+        season_points = np.concatenate(
+            [
+                np.broadcast_to(season.points[category], (n_simulations, n_pids, n_computed)),
+                points[category],
+            ],
+            axis=2,
+        )
+        # Championship points are the sum of the best tournaments, as in Rankings
+        best_points = -np.sort(-season_points, axis=2)[:, :, : season.n_best_tournaments]
+        cum_points = best_points.sum(axis=2)
+        participations = (season_points > 0).sum(axis=2)
+        championship_points[category] = cum_points.sum(axis=0)
+
+        # Ties are resolved by fewer participations
+        order = np.argsort(-(cum_points - participations / (participations.max() + 1)), axis=1)
+        podium = order[:, :3]
+        classified = np.take_along_axis(cum_points, podium, axis=1) > 0
+        podiums[:, category, : podium.shape[1]] = np.where(classified, podium, -1)
+        champions[:, category] = podiums[:, category, 0]
+
+    return {
+        "ratings": ratings.astype(np.float32),
+        "categories": rules.rating_category_codes(ratings).astype(np.int8),
+        "champions": champions,
+        "podiums": podiums,
+        "championship_points": championship_points,
+    }
+
+
+def _simulate_chunk(args) -> dict:
+    season, n_tournaments, n_simulations, seed = args
+    return simulate(season, n_tournaments, n_simulations, seed)
+
+
+def summarize(season: Season, results: List[dict]) -> Dict[str, pd.DataFrame]:
+    """Probability distributions of ratings, categories and championships per player."""
+    rules = season.rules
+    ratings = np.concatenate([result["ratings"] for result in results])
+    categories = np.concatenate([result["categories"] for result in results])
+    champions = np.concatenate([result["champions"] for result in results])
+    podiums = np.concatenate([result["podiums"] for result in results])
+    n_simulations = len(ratings)
+    championship_points = sum(result["championship_points"] for result in results) / n_simulations
+
+    current_categories = rules.rating_category_codes(season.ratings)
+    ratings_df = pd.DataFrame(
+        {
+            "name": season.names,
+            "category": np.array(rules.categories, dtype=object)[current_categories],
+            "rating": season.ratings,
+            "rating_mean": ratings.mean(axis=0),
+            "rating_p10": np.percentile(ratings, 10, axis=0),
+            "rating_p50": np.percentile(ratings, 50, axis=0),
+            "rating_p90": np.percentile(ratings, 90, axis=0),
+            "promotion": (categories < current_categories).mean(axis=0),
+            "relegation": (categories > current_categories).mean(axis=0),
+        },
+        index=pd.Index(season.pids, name="pid"),
+    )
+    for code, category in enumerate(rules.categories[:-1]):
+        ratings_df[category] = (categories == code).mean(axis=0)
+
+    championships = []
+    for code, category in enumerate(rules.categories):
+        positions = np.arange(len(season.pids))
+        champion = (champions[:, code, np.newaxis] == positions).mean(axis=0)
+        podium = (podiums[:, code, :, np.newaxis] == positions).any(axis=1).mean(axis=0)
+        current_points = np.sort(season.points[code], axis=1)[:, ::-1]
+        category_df = pd.DataFrame(
+            {
+                "category": category,
+                "pid": season.pids,
+                "name": season.names,
+                "points": current_points[:, : season.n_best_tournaments].sum(axis=1),
+                "points_mean": championship_points[code],
+                "champion": champion,
+                "podium": podium,
+            }
+        )
+        championships.append(category_df.loc[category_df.points_mean > 0])
+    championships_df = pd.concat(championships, ignore_index=True).sort_values(
+        ["category", "champion", "points_mean"],
+        ascending=[True, False, False],
+        key=lambda col: col.map(rules.categories.index) if col.name == "category" else col,
+        ignore_index=True,
+    )
+
+    return {
+        "ratings": ratings_df.sort_values("rating", ascending=False),
+        "championships": championships_df,
+    }
+
+
+def main(
+    n_tournaments: int,
+    n_simulations: int = 10000,
+    config_initial_date: str = "220101",
+    jobs: int = 1,
+    seed: int | None = None,
+) -> Dict[str, pd.DataFrame]:
+    """Project final standings of the season after n_tournaments more tournaments.
+
+    Function to run after compute_rankings.main(). It will read players, tournaments and
+    rankings in pickles. Projection is saved into the projection_filename of config and
+    returned: probability of final categories and quantiles of ratings per player, and
+    probability to be champion or on the podium of each championship category.
+    """
+    logger.info("Starting projection!")
+
+    ConfigManager().set_current_config(date=config_initial_date)
+    cfg = ConfigManager().current_config
+
+    tournaments = helpers.load_from_pickle(cfg.io.pickle.tournaments)
+    players = helpers.load_from_pickle(cfg.io.pickle.players)
+    rankings = helpers.load_from_pickle(cfg.io.pickle.rankings)
+
+    # Projection is based on the config after the last tournament
+    tids = list(tournaments)
+    tournament_date = tournaments[tids[-1]].iloc[0].date.strftime("%y%m%d")
+    ConfigManager().set_current_config(date=tournament_date)
+    rankings.update_config()
+    season = load_season(tournaments, players, rankings, tids[-1])
+    logger.info("Probability to win a match has a logistic scale of %.0f", season.scale)
+
+    # Chunks have independent random streams, results are the same for any number of jobs
+    chunks = [
+        min(CHUNK_SIMULATIONS, n_simulations - start)
+        for start in range(0, n_simulations, CHUNK_SIMULATIONS)
+    ]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunks))
+    chunks_args = [
+        (season, n_tournaments, chunk, chunk_seed) for chunk, chunk_seed in zip(chunks, seeds)
+    ]
+    logger.info("Simulating %d seasons with %d jobs", n_simulations, jobs)
+    if jobs > 1:
+        mp_context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context) as executor:
+            results = list(executor.map(_simulate_chunk, chunks_args))
+    else:
+        results = [_simulate_chunk(chunk_args) for chunk_args in chunks_args]
+
+    projection = summarize(season, results)
+
+    # Restore config for the output filename
+    ConfigManager().set_current_config(date=config_initial_date)
+    xlsx_filename = cfg.io.data_folder + cfg.io.xlsx.projection_filename
+    with pd.ExcelWriter(xlsx_filename) as writer:
+        for sheet_name, df in projection.items():
+            df.to_excel(writer, sheet_name=sheet_name)
+    logger.info("Projection saved into '%s'", xlsx_filename)
+
+    return projection
+
+
+if __name__ == "__main__":
+    main(n_tournaments=4)
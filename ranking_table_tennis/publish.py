@@ -51,7 +51,7 @@ def main(last=True, tournament_num=None, config_initial_date="220101"):
         tid = tids[tournament_num]
 
     # Get the tid of the previous tournament
-    prev_tid = tids[tids.index(tid) - 1]
+    prev_tid = tids[tournaments.get_ordinal(tid) - 1]
 
     # Update config
     tournament_date = tournaments[tid].iloc[0].date.strftime("%y%m%d")
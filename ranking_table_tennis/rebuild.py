@@ -0,0 +1,127 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Set
+
+from ranking_table_tennis.configs import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+
+def season_initial_date(season: int) -> str:
+    """Config initial date of a season, i.e. 220101 for 2022."""
+    return f"{season % 100:02d}0101"
+
+
+def parse_seasons(seasons: str) -> List[int]:
+    """Return the seasons given as a range (2021-2026), a list (2021,2023) or both.
+
+    Raise ValueError if a season has no config available.
+    """
+    parsed = []
+    for item in seasons.split(","):
+        first, _, last = item.strip().partition("-")
+        parsed.extend(range(int(first), int(last or first) + 1))
+
+    for season in parsed:
+        if ConfigManager().get_valid_configuration(season_initial_date(season)) is None:
+            raise ValueError(f"No config available for season {season}")
+
+    return sorted(set(parsed))
+
+
+def season_files(season: int) -> Set[str]:
+    """Files of the data folder written by name when the season is rebuilt.
+
+    Other files (raw rankings, markdowns and plots) are named after tids of the season.
+    """
+    cfg = ConfigManager().get_valid_config(season_initial_date(season))
+    # Files of each tournament to publish are checked with the first tid of the season
+    filenames = [*cfg.io.pickle.values(), *cfg.io.xlsx.values()]
+    return {
+        os.path.join(cfg.io.data_folder, filename.replace("NN", f"S{season}T01"))
+        for filename in filenames
+    }
+
+
+def check_isolated_files(seasons: List[int]) -> None:
+    """Raise ValueError if two seasons would write the same file, seasons are rebuilt in
+    parallel in the same data folder."""
+    seasons_of_files: Dict[str, int] = {}
+    for season in seasons:
+        for filename in season_files(season):
+            if filename in seasons_of_files:
+                raise ValueError(
+                    f"Seasons {seasons_of_files[filename]} and {season} share '{filename}'"
+                )
+            seasons_of_files[filename] = season
+
+
+def run_season(config_initial_date: str, download: bool = True, check_updates: bool = True) -> int:
+    """Preprocess unattended, compute and publish all tournaments of a season.
+
+    Returns the number of tournaments published.
+    """
+    from ranking_table_tennis import compute_rankings, preprocess_unattended, publish
+
+    # Download and preprocess with no prev rankings
+    preprocess_unattended.main(config_initial_date, download=download, check_updates=check_updates)
+    # Computing ratings so suggestions to new players can be given and assigned
+    compute_rankings.main(config_initial_date, incremental=True)
+    # preprocessing twice to assign rating as much as possible
+    preprocess_unattended.main(config_initial_date, download=False, check_updates=False)
+    # New players that played only with new players might not be resolved. Try it one more time
+    preprocess_unattended.main(config_initial_date, download=False, check_updates=False)
+    # Computing ratings to publish
+    n_processed_tournaments = compute_rankings.main(config_initial_date, incremental=True)
+    # Publish tournament
+    for tournament_n in range(1, n_processed_tournaments + 1):
+        publish.main(tournament_num=tournament_n, config_initial_date=config_initial_date)
+
+    return n_processed_tournaments
+
+
+def _rebuild_season(season: int, download: bool, log_level: int) -> int:
+    """Entry point of worker processes, they do not inherit the log level of the parent."""
+    logging.getLogger("ranking_table_tennis").setLevel(log_level)
+    logger.info("Rebuilding season %d", season)
+
+    return run_season(season_initial_date(season), download=download, check_updates=False)
+
+
+def main(seasons: List[int], jobs: int | None = None, download: bool = False) -> List[int]:
+    """Rebuild all tournaments of the given seasons, each one in its own process.
+
+    Seasons are independent: each one has its own config and its files in the data folder
+    are suffixed with its year. Workers are spawned, so the state of ConfigManager is not
+    shared between seasons.
+
+    If download=True, the tournaments spreadsheet of each season is downloaded first.
+
+    Returns the seasons that failed. Raise ValueError if seasons share a file (see
+    check_isolated_files).
+    """
+    check_isolated_files(seasons)
+    jobs = jobs or min(len(seasons), os.cpu_count() or 1)
+    log_level = logging.getLogger("ranking_table_tennis").getEffectiveLevel()
+    logger.info("Rebuilding seasons %s with %d jobs", seasons, jobs)
+
+    failed = []
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context) as executor:
+        futures: Dict = {
+            executor.submit(_rebuild_season, season, download, log_level): season
+            for season in seasons
+        }
+        for future in as_completed(futures):
+            season = futures[future]
+            try:
+                n_tournaments = future.result()
+            except Exception:
+                logger.exception("Failed to rebuild season %d", season)
+                failed.append(season)
+            else:
+                logger.info("Season %d rebuilt, %d tournaments", season, n_tournaments)
+
+    return sorted(failed)
@@ -0,0 +1,213 @@
+import copy
+import itertools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+from omegaconf import OmegaConf
+
+from ranking_table_tennis import helpers, models
+from ranking_table_tennis.compute_rankings import compute_tournaments
+from ranking_table_tennis.configs import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+# Inputs of the season shared by all variants computed in a worker process
+_season: Dict[str, Any] = {}
+
+
+def load_grid(grid_filename: str) -> Dict[str, List[Any]]:
+    """Load a grid of overrides from a yaml file, e.g.
+
+    compute.rating_factor: [1.5, 2.0]
+    compute.categories_thresholds: [[1400, 950], [1300, 700]]
+    compute.points_per_round_csv: [points_per_round.csv, /path/to/other_points.csv]
+
+    Each key has a list of values to try, a list of lists if the config value is a list.
+    A single value is the same as a list with that value.
+    """
+    grid = OmegaConf.to_container(OmegaConf.load(grid_filename), resolve=True)
+    return {key: values if isinstance(values, list) else [values] for key, values in grid.items()}
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Return every combination of the values in grid, as dicts of dotted key to value."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+
+
+def to_overrides(variant: Dict[str, Any]) -> dict:
+    """Nested overrides of a variant, {"compute.rating_factor": 1.5} is
+    {"compute": {"rating_factor": 1.5}}."""
+    overrides: dict = {}
+    for dotted_key, value in variant.items():
+        *parents, key = dotted_key.split(".")
+        node = overrides
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = value
+
+    return overrides
+
+
+def check_variants(variants: List[Dict[str, Any]], config_initial_date: str) -> None:
+    """Raise ValueError if a variant changes the categories or the number of categories
+    thresholds, all variants share the initial ranking that has columns by category."""
+    config_manager = ConfigManager()
+    cfg = config_manager.get_valid_config(config_initial_date)
+    categories = list(cfg.categories)
+    n_thresholds = len(cfg.compute.categories_thresholds)
+    try:
+        for variant in variants:
+            config_manager.set_overrides(to_overrides(variant))
+            variant_cfg = config_manager.get_valid_config(config_initial_date)
+            if (
+                list(variant_cfg.categories) != categories
+                or len(variant_cfg.compute.categories_thresholds) != n_thresholds
+            ):
+                raise ValueError(f"Overrides changing the categories are not supported: {variant}")
+    finally:
+        config_manager.set_overrides(None)
+
+
+def summarize(
+    players: models.Players, rankings: models.Rankings, tid: str
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Return final ratings and champions of each category at tid.
+
+    Champions are sorted as in the championship sheets: by points, participations and name.
+    """
+    ranking = rankings[tid].merge(players.players_df.loc[:, ["name"]], on="pid")
+    ratings = ranking.loc[:, ["pid", "name", "rating", "category", "active"]].sort_values(
+        ["rating", "pid"], ascending=[False, True], ignore_index=True
+    )
+
+    champions = []
+    for cat, point_col, participations_col in zip(
+        rankings.cfg.categories,
+        rankings.cum_points_cat_columns(),
+        rankings.participations_cat_columns(),
+    ):
+        classified = ranking.loc[ranking[point_col] > 0].sort_values(
+            [point_col, participations_col, "name"], ascending=[False, True, True]
+        )
+        if classified.empty:
+            continue
+        champion = classified.iloc[0]
+        champions.append(
+            {
+                "category": cat,
+                "pid": champion.pid,
+                "name": champion["name"],
+                "points": champion[point_col],
+            }
+        )
+
+    return ratings, pd.DataFrame(champions, columns=["category", "pid", "name", "points"])
+
+
+def _init_worker(
+    config_initial_date: str,
+    tournaments: models.Tournaments,
+    players: models.Players,
+    rankings: models.Rankings,
+    log_level: int,
+) -> None:
+    # Per tournament logs of every variant are only shown when debugging
+    logging.getLogger("ranking_table_tennis").setLevel(max(log_level, logging.WARNING))
+    _season.update(
+        config_initial_date=config_initial_date,
+        tournaments=tournaments,
+        players=players,
+        rankings=rankings,
+    )
+
+
+def _compute_variant(variant: Dict[str, Any]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Replay the season with the overrides of variant, config files are loaded once per worker."""
+    ConfigManager().set_overrides(to_overrides(variant))
+    ConfigManager().set_current_config(date=_season["config_initial_date"])
+
+    tournaments = _season["tournaments"]
+    # Round priorities might have changed, best rounds are computed again
+    tournaments.update_config()
+    players = copy.deepcopy(_season["players"])
+    rankings = copy.deepcopy(_season["rankings"])
+    rankings.update_config()
+
+    tids = [ConfigManager().current_config.initial_metadata.initial_tid] + list(tournaments)
+    compute_tournaments(tournaments, players, rankings, tids, tids[1:])
+
+    return summarize(players, rankings, tids[-1])
+
+
+def main(
+    grid: Dict[str, List[Any]],
+    config_initial_date: str = "220101",
+    jobs: int | None = None,
+    xlsx_filename: str | None = None,
+) -> Dict[str, pd.DataFrame]:
+    """Compute the season for every combination of config overrides in grid.
+
+    Function to run after preprocess.main(), it will read players and tournaments in pickles.
+
+    Variant 0 has no overrides. Overrides must keep the categories of the config files, as
+    all variants start from the same initial ranking. The summary of all variants is saved
+    into xlsx_filename (sweep_filename of config by default) and returned: overrides of each
+    variant, final ratings and categories, and champions of each category.
+    """
+    logger.info("Starting sweep!")
+
+    ConfigManager().set_current_config(date=config_initial_date)
+    cfg = ConfigManager().current_config
+
+    variants = [{}] + expand_grid(grid)
+    check_variants(variants, config_initial_date)
+
+    # Inputs are loaded once and shared by all variants
+    tournaments = helpers.load_from_pickle(cfg.io.pickle.tournaments)
+    players = helpers.load_from_pickle(cfg.io.pickle.players)
+    tournaments.assign_pid_from_players(players)
+    rankings = helpers.load_initial_ranking_sheet()
+
+    jobs = jobs or min(len(variants), os.cpu_count() or 1)
+    logger.info("Computing %d variants with %d jobs", len(variants), jobs)
+
+    log_level = logging.getLogger("ranking_table_tennis").getEffectiveLevel()
+    mp_context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(config_initial_date, tournaments, players, rankings, log_level),
+    ) as executor:
+        chunksize = max(1, len(variants) // (4 * jobs))
+        summaries = list(executor.map(_compute_variant, variants, chunksize=chunksize))
+
+    variants_df = pd.DataFrame(
+        [{key: str(value) for key, value in variant.items()} for variant in variants],
+        columns=list(grid),
+    ).rename_axis("variant")
+    ratings_df = pd.concat(
+        [ratings.assign(variant=num) for num, (ratings, _) in enumerate(summaries)]
+    ).set_index("variant")
+    champions_df = pd.concat(
+        [champions.assign(variant=num) for num, (_, champions) in enumerate(summaries)]
+    ).set_index("variant")
+    summary = {"variants": variants_df, "ratings": ratings_df, "champions": champions_df}
+
+    if xlsx_filename is None:
+        xlsx_filename = cfg.io.data_folder + cfg.io.xlsx.sweep_filename
+    with pd.ExcelWriter(xlsx_filename) as writer:
+        for sheet_name, df in summary.items():
+            df.to_excel(writer, sheet_name=sheet_name)
+    logger.info("Sweep summary saved into '%s'", xlsx_filename)
+
+    return summary
+
+
+if __name__ == "__main__":
+    main({})
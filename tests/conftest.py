@@ -7,6 +7,9 @@ import pandas as pd
 import pytest
 from pandas.testing import assert_frame_equal
 
+from ranking_table_tennis.models import schema
+from ranking_table_tennis.models.schema import apply_schema
+
 logger = logging.getLogger(__name__)
 
 
@@ -99,7 +102,9 @@ def load_expected_output(csv_filename, parse_dates=False):
 
 @pytest.fixture(scope="session")
 def ref_tournaments_df():
-    return load_expected_output("tournaments_df.csv", parse_dates=True)
+    return apply_schema(
+        load_expected_output("tournaments_df.csv", parse_dates=True), schema.TOURNAMENTS_SCHEMA
+    )
 
 
 @pytest.fixture(scope="session")
@@ -109,19 +114,75 @@ def ref_players_df():
 
 @pytest.fixture(scope="session")
 def ref_history_df():
-    return load_expected_output("history_df.csv")
+    return apply_schema(load_expected_output("history_df.csv"), schema.HISTORY_SCHEMA)
 
 
 @pytest.fixture(scope="session")
 def ref_rating_details_df():
-    return load_expected_output("rating_details_df.csv", parse_dates=True)
+    return apply_schema(
+        load_expected_output("rating_details_df.csv", parse_dates=True),
+        schema.RATING_DETAILS_SCHEMA,
+    )
 
 
 @pytest.fixture(scope="session")
 def ref_ranking_df():
-    return load_expected_output("ranking_df.csv", parse_dates=True)
+    ranking_df = load_expected_output("ranking_df.csv", parse_dates=True)
+    participations_schema = {
+        col: schema.PARTICIPATIONS_DTYPE
+        for col in ranking_df.columns
+        if col.startswith("participations_cat_")
+    }
+    return apply_schema(ranking_df, {**schema.RANKING_SCHEMA, **participations_schema})
 
 
 @pytest.fixture(scope="session")
 def ref_championship_details_df():
-    return load_expected_output("championship_details_df.csv")
+    return apply_schema(
+        load_expected_output("championship_details_df.csv"), schema.CHAMPIONSHIP_DETAILS_SCHEMA
+    )
+
+
+@pytest.fixture
+def make_tournaments_df():
+    """Factory of tournaments DataFrames with three fake matches, given columns replace the
+    default ones."""
+
+    def make_tournaments_df(**columns):
+        return pd.DataFrame(
+            {
+                "sheet_name": "nada",
+                "tournament_name": "nada",
+                "date": ["2099 01 01", "2099 01 01", "2099 02 01"],
+                "location": "nanana",
+                "player_a": ["Star, Ringo", "Star, Ringo", "Lennon, John"],
+                "player_b": ["Lennon, John", "Nadie", "Harrison, George"],
+                "sets_a": [3, 3, 3],
+                "sets_b": [0, 1, 2],
+                "round": "octavos",
+                "category": "segunda",
+                **columns,
+            }
+        )
+
+    return make_tournaments_df
+
+
+@pytest.fixture
+def make_players():
+    """Factory of Players with given names, pids are 100, 200, 300..."""
+    from ranking_table_tennis import models
+
+    def make_players(names):
+        return models.Players(
+            pd.DataFrame(
+                {
+                    "pid": [100 * num for num in range(1, len(names) + 1)],
+                    "name": names,
+                    "affiliation": "",
+                    "city": "",
+                }
+            )
+        )
+
+    return make_players
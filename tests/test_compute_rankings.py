@@ -43,3 +43,154 @@ def test_compute_rankings_outputs_rankings(
     assert_frame_equal(rankings_output.ranking_df, ref_ranking_df)
     assert_frame_equal(rankings_output.rating_details_df, ref_rating_details_df)
     assert_frame_equal(rankings_output.championship_details_df, ref_championship_details_df)
+
+
+def test_compute_rankings_outputs_compact_dtypes():
+    cfg = ConfigManager().current_config
+    tournaments_output = helpers.load_from_pickle(cfg.io.pickle.tournaments)
+    players_output = helpers.load_from_pickle(cfg.io.pickle.players)
+    rankings_output = helpers.load_from_pickle(cfg.io.pickle.rankings)
+
+    tournaments_dtypes = {
+        "tid": "object",
+        "sheet_name": "category",
+        "tournament_name": "category",
+        "date": "datetime64[ns]",
+        "year": "int16",
+        "location": "category",
+        "player_a": "object",
+        "player_b": "object",
+        "sets_a": "int8",
+        "sets_b": "int8",
+        "round": "category",
+        "category": "category",
+        "winner": "object",
+        "winner_round": "category",
+        "loser": "object",
+        "loser_round": "category",
+        "promote": "bool",
+        "sanction": "bool",
+        "bonus": "bool",
+        "winner_pid": "int32",
+        "loser_pid": "int32",
+    }
+    expected_dtypes = [
+        (tournaments_output.tournaments_df, tournaments_dtypes),
+        (
+            players_output.history_df,
+            {"tid": "object", "pid": "int32", "category": "category", "best_round": "category"},
+        ),
+        (
+            rankings_output.ranking_df,
+            {
+                "tid": "object",
+                "tournament_name": "category",
+                "location": "category",
+                "pid": "int32",
+                "rating": "float64",
+                "category": "object",
+                "points_cat_1": "float64",
+                "cum_points_cat_1": "float64",
+                "participations_cat_1": "float32",
+                "cum_tids_cat_1": "object",
+            },
+        ),
+        (
+            rankings_output.rating_details_df,
+            {
+                **tournaments_dtypes,
+                "rating_to_winner": "float64",
+                "winner_category": "category",
+                "loser_category": "category",
+                "factor": "float64",
+            },
+        ),
+        (
+            rankings_output.championship_details_df,
+            {
+                "tid": "object",
+                "name": "object",
+                "pid": "int32",
+                "category": "category",
+                "best_round": "category",
+                "points": "int32",
+            },
+        ),
+    ]
+    for output_df, dtypes in expected_dtypes:
+        assert {col: str(output_df[col].dtype) for col in dtypes} == dtypes
+
+
+def test_compute_rankings_incremental_resumes_last_computed(
+    caplog, ref_ranking_df, ref_rating_details_df, ref_championship_details_df
+):
+    with caplog.at_level("INFO"):
+        compute_rankings.main(incremental=True)
+    assert "Resuming rankings computed up to S2022T04" in caplog.text
+    assert "** Computing" not in caplog.text
+
+    cfg = ConfigManager().current_config
+    rankings_output = helpers.load_from_pickle(cfg.io.pickle.rankings)
+
+    assert_frame_equal(rankings_output.ranking_df, ref_ranking_df)
+    assert_frame_equal(rankings_output.rating_details_df, ref_rating_details_df)
+    assert_frame_equal(rankings_output.championship_details_df, ref_championship_details_df)
+
+
+def test_compute_rankings_incremental_recomputes_changed_inputs(caplog, ref_ranking_df):
+    cfg = ConfigManager().current_config
+    rankings_output = helpers.load_from_pickle(cfg.io.pickle.rankings)
+    rankings_output.inputs_fingerprints["S2022T02"] = "changed"
+    helpers.save_to_pickle(rankings=rankings_output)
+
+    with caplog.at_level("INFO"):
+        compute_rankings.main(incremental=True)
+    assert "Inputs have changed" in caplog.text
+    assert "** Computing S2022T01" in caplog.text
+
+    rankings_output = helpers.load_from_pickle(cfg.io.pickle.rankings)
+    assert_frame_equal(rankings_output.ranking_df, ref_ranking_df)
+
+
+RANKINGS_FRAMES = ["ranking_df", "rating_details_df", "championship_details_df"]
+
+
+def test_compute_rankings_array_engine(ref_players_df, ref_history_df):
+    cfg = ConfigManager().current_config
+    compute_rankings.main()
+    pandas_rankings = helpers.load_from_pickle(cfg.io.pickle.rankings)
+    compute_rankings.main(engine="array")
+    array_rankings = helpers.load_from_pickle(cfg.io.pickle.rankings)
+    players_output = helpers.load_from_pickle(cfg.io.pickle.players)
+
+    assert_frame_equal(players_output.players_df, ref_players_df)
+    assert_frame_equal(players_output.history_df, ref_history_df)
+    # Results are bit-identical to the ones of the pandas engine
+    for frame in RANKINGS_FRAMES:
+        assert_frame_equal(
+            getattr(array_rankings, frame), getattr(pandas_rankings, frame), check_exact=True
+        )
+
+
+def test_compute_rankings_array_engine_incremental(caplog):
+    cfg = ConfigManager().current_config
+    compute_rankings.main()
+    pandas_rankings = helpers.load_from_pickle(cfg.io.pickle.rankings)
+
+    rankings_output = helpers.load_from_pickle(cfg.io.pickle.rankings)
+    rankings_output.inputs_fingerprints.pop("S2022T04")
+    for frame in RANKINGS_FRAMES:
+        frame_df = getattr(rankings_output, frame)
+        setattr(rankings_output, frame, frame_df[frame_df.tid != "S2022T04"])
+    helpers.save_to_pickle(rankings=rankings_output)
+
+    with caplog.at_level("INFO"):
+        compute_rankings.main(incremental=True, engine="array")
+    assert "Resuming rankings computed up to S2022T03" in caplog.text
+    assert "** Computing S2022T04" in caplog.text
+
+    rankings_output = helpers.load_from_pickle(cfg.io.pickle.rankings)
+    for frame in RANKINGS_FRAMES:
+        assert_frame_equal(
+            getattr(rankings_output, frame), getattr(pandas_rankings, frame), check_exact=True
+        )
@@ -0,0 +1,39 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from ranking_table_tennis.configs import ConfigManager
+
+
+def test_compiled_rules_are_cached_per_configuration():
+    ConfigManager().set_current_config(date="220101")
+    rules = ConfigManager().current_rules
+    ConfigManager().set_current_config(date="220101")
+
+    assert ConfigManager().current_rules is rules
+
+
+def test_compiled_rules_tables():
+    ConfigManager().set_current_config(date="220101")
+    cfg = ConfigManager().current_config
+    rules = ConfigManager().current_rules
+
+    assert rules.categories == tuple(cfg.categories)
+    assert np.all(np.diff(rules.expected_result_table[:, 0]) > 0)
+    assert rules.best_rounds_points.shape == (len(rules.categories), len(rules.round_names))
+    assert rules.best_rounds_points[0, rules.round_names.index("primero")] == 1000
+    assert rules.round_priority[rules.round_codes(["semifinal"])[0]] == 4
+    assert rules.category_codes(["segunda", "unknown"]).tolist() == [1, -1]
+
+    with pytest.raises(ValueError):
+        rules.best_rounds_points[0, 0] = 1
+
+
+def test_compiled_rules_can_be_pickled():
+    ConfigManager().set_current_config(date="220101")
+    rules = ConfigManager().current_rules
+    unpickled_rules = pickle.loads(pickle.dumps(rules))
+
+    assert unpickled_rules.round_names == rules.round_names
+    assert np.array_equal(unpickled_rules.best_rounds_points, rules.best_rounds_points)
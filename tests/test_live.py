@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+from conftest import base_run_before_tests
+from pandas.testing import assert_series_equal
+
+from ranking_table_tennis import compute_rankings, helpers, live, preprocess
+from ranking_table_tennis.configs import ConfigManager
+
+
+@pytest.fixture(scope="module", autouse=True)
+def run_before_tests():
+    """To be run once before all tests"""
+    base_run_before_tests()
+    preprocess.main()
+    compute_rankings.main()
+
+
+def test_parse_match():
+    assert live.parse_match("player_a,player_b,sets_a,sets_b,round,category\n") is None
+    assert live.parse_match("\n") is None
+    assert live.parse_match(" juan  pérez ,Pedro Gomez,3,1, Final ,PRIMERA\n") == {
+        "player_a": "Juan  Perez",
+        "player_b": "Pedro Gomez",
+        "sets_a": 3,
+        "sets_b": 1,
+        "round": "final",
+        "category": "primera",
+    }
+    with pytest.raises(ValueError):
+        live.parse_match("Juan Perez,Pedro Gomez,3\n")
+
+
+def test_process_match():
+    cfg = ConfigManager().current_config
+    match = live.parse_match(f"Juan Perez,Pedro Gomez,1,3,{cfg.roundnames.final},primera")
+
+    processed = live.process_match(match, cfg)
+    assert processed["winner"] == "Pedro Gomez"
+    assert processed["winner_round"] == cfg.roundnames.champion
+    assert processed["loser_round"] == cfg.roundnames.second
+    assert not (processed["promote"] or processed["sanction"] or processed["bonus"])
+
+    sanction = live.process_match({**match, "sets_a": -10, "sets_b": -10}, cfg)
+    assert sanction["sanction"] and sanction["loser"] == "Pedro Gomez"
+    with pytest.raises(ValueError):
+        live.process_match({**match, "sets_a": 2, "sets_b": 2}, cfg)
+
+
+def test_live_matches_computed_ranking(ref_ranking_df):
+    cfg = ConfigManager().current_config
+    tournaments = helpers.load_from_pickle(cfg.io.pickle.tournaments)
+    matches_filename = cfg.io.data_folder + "live_matches.csv"
+    tournaments["S2022T04"].loc[:, live.MATCH_COLUMNS].to_csv(matches_filename, index=False)
+
+    # Last tournament is played live after computing the previous ones
+    rankings = helpers.load_from_pickle(cfg.io.pickle.rankings)
+    rankings.ranking_df = rankings.ranking_df.query("tid != 'S2022T04'")
+    helpers.save_to_pickle(rankings=rankings)
+
+    live_tournament = live.main(matches_filename, today=date(2022, 7, 24))
+
+    assert live_tournament.n_matches == len(tournaments["S2022T04"])
+    standings = live_tournament.standings()
+    expected = ref_ranking_df.query("tid == 'S2022T04'").reset_index(drop=True)
+    for col in ["pid", "rating", "category"] + rankings.points_cat_columns():
+        assert_series_equal(standings[col], expected[col], check_dtype=False)
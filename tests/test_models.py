@@ -1,5 +1,9 @@
+import pickle
+
 import numpy as np
 import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
 
 from ranking_table_tennis import models
 from ranking_table_tennis.configs import ConfigManager
@@ -31,6 +35,35 @@ def test_points_to_assign_unexpected_result():
         assert points_to_winner_and_loser == output
 
 
+def test_batch_points_to_assign_matches_single_match_rules():
+    ConfigManager().set_current_config(date="220101")
+    rankings = models.Rankings()
+    rating_diff = np.array([-1000, -150, -25, -24, 0, 24, 25, 150, 1000], dtype=float)
+    to_winner, to_loser = rankings._batch_points_to_assign(rating_diff)
+    for diff, points_to_winner, points_to_loser in zip(rating_diff, to_winner, to_loser):
+        rating_winner, rating_loser = 1000 + max(diff, 0), 1000 - min(diff, 0)
+        assert rankings._points_to_assign(rating_winner, rating_loser) == (
+            points_to_winner,
+            points_to_loser,
+        )
+
+
+def test_batch_get_factor():
+    ConfigManager().set_current_config(date="220101")
+    cfg = ConfigManager().current_config
+    factors = models.Rankings()._batch_get_factor(
+        rating_diff=np.array([10.0, -10.0, 10.0, -10.0]),
+        category_winner=np.array(["primera", "segunda", "primera", "primera"]),
+        category_loser=np.array(["segunda", "primera", "primera", "segunda"]),
+        not_own_category=np.array([False, False, False, True]),
+    )
+    expected_factors = cfg.compute.rating_factor * np.array(
+        [cfg.compute.category_expected_factor, cfg.compute.category_unexpected_factor, 1.0, 1.0]
+    )
+
+    assert np.array_equal(factors, expected_factors)
+
+
 def test_compute_best_rounds():
     tid = "S2099T01"
     dict_tour_entry = {
@@ -55,15 +88,255 @@ def test_compute_best_rounds():
     expected_output = pd.DataFrame(
         {
             "name": ["Star, Ringo", "Lennon, John"],
-            "pid": [100, 200],
-            "category": ["segunda", "segunda"],
-            "best_round": ["octavos", "octavos"],
+            "pid": np.array([100, 200], dtype=np.int32),
+            "category": pd.Categorical(["segunda", "segunda"]),
+            "best_round": pd.Categorical(["octavos", "octavos"]),
         }
     )
 
     assert best_rounds.equals(expected_output)
 
 
+def test_players_participation_matrix():
+    players = models.Players()
+    best_rounds = pd.DataFrame(
+        {
+            "pid": [1, 2, 2],
+            "category": ["primera", "primera", "segunda"],
+            "best_round": ["final", "octavos", "final"],
+        }
+    )
+    players.update_histories("S2099T01", best_rounds)
+    players.update_histories("S2099T02", best_rounds[best_rounds.pid == 2])
+
+    matrix = players.participation_matrix([2, 1, 3], ["S2099T02", "S2099T01", "S2099T03"])
+    expected_matrix = np.array([[True, True, False], [False, True, False], [False, False, False]])
+
+    assert np.array_equal(matrix, expected_matrix)
+
+    # Matrix is rebuilt from histories of a new players database
+    rebuilt_players = models.Players(history_df=players.history_df)
+    assert np.array_equal(
+        rebuilt_players.participation_matrix([2, 1, 3], ["S2099T02", "S2099T01", "S2099T03"]),
+        expected_matrix,
+    )
+
+
+def test_compute_all_best_rounds(make_tournaments_df, make_players):
+    tour_df = make_tournaments_df(
+        player_b=["Lennon, John", "Harrison, George", "Star, Ringo"],
+        round=["octavos", "final", "octavos"],
+    )
+    tournaments = models.Tournaments(tour_df)
+    players = make_players(["Star, Ringo", "Lennon, John", "Harrison, George"])
+    tournaments.assign_pid_from_players(players)
+
+    best_rounds = tournaments.compute_all_best_rounds()
+    assert list(best_rounds.tid) == ["S2099T01"] * 3 + ["S2099T02"] * 2
+    assert list(best_rounds.pid) == [100, 200, 300, 100, 200]
+    roundnames = ConfigManager().current_config.roundnames
+    assert list(best_rounds.best_round) == [
+        roundnames.champion,
+        "octavos",
+        roundnames.second,
+        "octavos",
+        "octavos",
+    ]
+
+    tid_best_rounds = tournaments.compute_best_rounds("S2099T02", players)
+    assert list(tid_best_rounds.columns) == ["name", "pid", "category", "best_round"]
+    assert tid_best_rounds.index.equals(pd.RangeIndex(2))
+    assert tournaments.compute_best_rounds("S2099T03", players).empty
+
+
+def test_tournaments_ordinals(make_tournaments_df):
+    tour_df = make_tournaments_df(
+        date=["2099 03 01", "2099 01 01", "2099 01 01", "2099 02 01"],
+        player_a="Star, Ringo",
+        player_b="Lennon, John",
+        sets_a=3,
+        sets_b=0,
+        round="final",
+    )
+    tournaments = models.Tournaments(tour_df)
+    initial_tid = ConfigManager().current_config.initial_metadata.initial_tid
+
+    assert list(tournaments) == ["S2099T01", "S2099T02", "S2099T03"]
+    assert tournaments.get_ordinal(initial_tid) == 0
+    assert tournaments.get_ordinal("S2099T02") == 2
+    # Rows are sorted by tid
+    assert list(tournaments.get_ordinals(tournaments.tournaments_df.tid)) == [1, 1, 2, 3]
+    # Ordinals are positions on the list of tids that starts with the initial tid
+    tids = [initial_tid] + list(tournaments)
+    assert all(tids[tournaments.get_ordinal(tid)] == tid for tid in tids)
+
+
+def test_tournaments_rows_of_tid(make_tournaments_df):
+    tour_df = make_tournaments_df(
+        date=["2099 02 01", "2099 01 01", "2099 01 01", "2099 01 01", "2099 01 01"],
+        player_a=["Star, Ringo", "Star, Ringo", "Star, Ringo", "Star, Ringo", "Nadie"],
+        player_b=["Lennon, John", "Harrison, George", "Lennon, John", "Lennon, John", "Bad"],
+        sets_a=[3, 3, -1, 0, -10],
+        sets_b=[0, 1, -1, 3, -10],
+    )
+    tournaments = models.Tournaments(tour_df)
+
+    # Rows of each tid keep their order
+    assert list(tournaments["S2099T01"].index) == [1, 2, 3, 4]
+    assert list(tournaments["S2099T02"].winner) == ["Star, Ringo"]
+    assert tournaments["S2099T03"].empty
+
+    assert list(tournaments.get_matches("S2099T01").index) == [1, 3]
+    assert list(tournaments.get_matches("S2099T01", to_exclude=["sanction"]).index) == [1, 2, 3]
+    assert tournaments.get_players_names("S2099T01") == [
+        "Bad",
+        "Harrison, George",
+        "Lennon, John",
+        "Star, Ringo",
+    ]
+    assert tournaments.get_players_names("S2099T01", category="primera") == []
+
+
+def test_tournaments_participants(make_tournaments_df, make_players):
+    tournaments = models.Tournaments(
+        make_tournaments_df(category=["segunda", "primera", "segunda"])
+    )
+    assert tournaments.get_players_names("S2099T01") == ["Lennon, John", "Nadie", "Star, Ringo"]
+    assert tournaments.get_players_names("S2099T01", "primera") == ["Nadie", "Star, Ringo"]
+    assert tournaments.get_players_pids("S2099T01") == []
+
+    players = make_players(["Star, Ringo", "Lennon, John", "Harrison, George"])
+    tournaments.assign_pid_from_players(players)
+    # Players without pid are left out of pids, not of names
+    assert tournaments.get_players_pids("S2099T01") == [100, 200]
+    assert "Nadie" in tournaments.get_players_names("S2099T01")
+    assert tournaments.get_players_pids("S2099T01", "primera") == [100]
+    assert tournaments.get_players_pids("S2099T03") == []
+
+    # Participants are saved with tournaments
+    unpickled = pickle.loads(pickle.dumps(tournaments))
+    assert unpickled.get_players_pids("S2099T02", "segunda") == [200, 300]
+
+
+def test_tournaments_assign_pid_incrementally(make_tournaments_df, make_players):
+    tournaments = models.Tournaments(make_tournaments_df())
+    players = make_players(["Star, Ringo", "Lennon, John"])
+    tournaments.assign_pid_from_players(players)
+    version = players.names_version
+    assert tournaments.tournaments_df["winner_pid"].tolist() == [100, 100, 200]
+    assert tournaments.tournaments_df["loser_pid"].isna().tolist() == [False, True, True]
+
+    # Nothing is assigned again while players do not change
+    tournaments.tournaments_df.loc[0, "winner_pid"] = 999
+    tournaments.assign_pid_from_players(players)
+    assert tournaments.tournaments_df.loc[0, "winner_pid"] == 999
+
+    # Only rows of new players are assigned again
+    players.add_new_player("harrison, george")
+    assert players.names_version != version
+    tournaments.assign_pid_from_players(players)
+    assert tournaments.tournaments_df["winner_pid"].tolist() == [999, 100, 200]
+    assert tournaments.tournaments_df.loc[2, "loser_pid"] == 201
+    assert tournaments.get_players_pids("S2099T02") == [200, 201]
+    # Pids of tids without changes are kept
+    assert tournaments.get_players_pids("S2099T01", "segunda") == [100, 200]
+
+    # Pids are integers once every name is known
+    players.add_new_player("nadie")
+    tournaments.assign_pid_from_players(players)
+    assert tournaments.tournaments_df["loser_pid"].tolist() == [200, 202, 201]
+    assert tournaments.tournaments_df["loser_pid"].dtype == np.int32
+    assert tournaments.get_players_pids("S2099T01") == [100, 200, 202, 999]
+
+
+def test_tournaments_append_sheet(make_tournaments_df, make_players):
+    def sheet_df(sheet_name, date, players_a, players_b, category):
+        return make_tournaments_df(
+            sheet_name=sheet_name,
+            tournament_name=f"torneo {sheet_name}",
+            date=date,
+            player_a=players_a,
+            player_b=players_b,
+            sets_a=3,
+            sets_b=[1] * len(players_a),
+            round=["final", "semifinal"][: len(players_a)],
+            category=category,
+        )
+
+    sheets = [
+        sheet_df(
+            "T01", "2099 01 01", ["star, ringo", "lennon, john"], ["Nadie", "Nadie"], "primera"
+        ),
+        sheet_df("T02", "2099 02 01", ["Lennon, John"], ["Harrison, George"], "segunda"),
+        sheet_df("T02", "2099 02 01", ["Nadie"], ["McCartney, Paul"], "primera"),
+        sheet_df("T01", "2100 01 05", ["McCartney, Paul"], ["Star, Ringo"], "tercera"),
+    ]
+    expected = models.Tournaments(pd.concat(sheets, ignore_index=True))
+
+    tournaments = models.Tournaments(sheets[0])
+    players = make_players(["Star, Ringo", "Nadie"])
+    tournaments.assign_pid_from_players(players)
+    for sheet in sheets[1:]:
+        tournaments.append_sheet(sheet)
+
+    # Appended sheets are read before they are concatenated
+    assert tournaments["S2100T03"]["player_a"].tolist() == ["Mccartney, Paul"]
+    assert tournaments.get_players_names("S2099T02") == [
+        "Harrison, George",
+        "Lennon, John",
+        "Mccartney, Paul",
+        "Nadie",
+    ]
+    assert len(tournaments._pending_sheets) == 3
+
+    # Pids of new rows are assigned from the same players
+    assert tournaments.tournaments_df["winner_pid"].isna().tolist() == [
+        False,
+        True,
+        True,
+        False,
+        True,
+    ]
+    tournaments.assign_pid_from_players(players)
+    expected.assign_pid_from_players(players)
+    assert_frame_equal(tournaments.tournaments_df, expected.tournaments_df)
+    assert list(tournaments) == ["S2099T01", "S2099T02", "S2100T03"]
+    assert tournaments.get_ordinal("S2100T03") == 3
+    assert tournaments["S2099T02"]["sheet_name"].tolist() == ["T02", "T02"]
+    assert tournaments.get_players_names("S2099T02", "primera") == ["Mccartney, Paul", "Nadie"]
+    assert tournaments.get_players_pids("S2099T02") == [200]
+    assert_frame_equal(tournaments.compute_all_best_rounds(), expected.compute_all_best_rounds())
+
+    # Sheets can not be appended before the last tournament
+    with pytest.raises(ValueError):
+        tournaments.append_sheet(sheets[1])
+    assert len(tournaments) == len(expected)
+
+
+def test_apply_schema():
+    from ranking_table_tennis.models.schema import apply_schema
+
+    df = pd.DataFrame(
+        {
+            "category": pd.Categorical(["b", "a"], categories=["c", "b", "a"]),
+            "round": ["final", "final"],
+            "pid": [1.0, np.nan],
+            "points": [10, 20],
+        }
+    )
+    schema = {"category": "category", "round": "category", "pid": "int32", "points": "int32"}
+    compact_df = apply_schema(df, schema)
+
+    # Categories are sorted and unused ones are removed, so they match inferred categories
+    assert list(compact_df["category"].cat.categories) == ["a", "b"]
+    assert list(compact_df["round"].cat.categories) == ["final"]
+    # Integers are only downcast without missing values
+    assert compact_df["pid"].dtype == float
+    assert compact_df["points"].dtype == np.int32
+    # Given DataFrame is not modified
+    assert df["round"].dtype == object
+
+
 def test_merge_preserve_left_index():
     df1 = pd.DataFrame({"A": [1, 2, 3], "B": [4, 5, 6]}, index=[0, 1, 2])
     df2 = pd.DataFrame({"C": [7, 8, 9], "B": [5, 6, 22]}, index=[10, 11, 12])
@@ -85,3 +358,132 @@ def test_merge_preserve_left_none_name_index():
 
     assert df1.index.equals(df_inner.index)
     assert df1.index.name == df_inner.index.name
+
+
+def test_players_normalize_added_players_on_read(caplog):
+    players = models.Players(
+        pd.DataFrame({"pid": [1], "name": ["star, ringo"], "affiliation": ["A"], "city": [None]})
+    )
+    players.add_new_player("lennón, john", city="liverpool ")
+    players.add_player(pd.Series({"name": "harrison, george", "city": None}, name=1))
+
+    assert "Players entries duplicated" in caplog.text
+    assert list(players.players_df.name) == ["Star, Ringo", "Lennon, John", "Harrison, George"]
+    assert list(players.players_df.city) == ["", "Liverpool", ""]
+    assert list(players.players_df.affiliation) == ["A", "", ""]
+
+
+def test_rankings_blocks_follow_appends_and_sorting():
+    ConfigManager().set_current_config(date="220101")
+    rankings = models.Rankings()
+    rankings.add_new_entry("S2022T00", 1, 1500.0)
+    rankings.add_new_entry("S2022T00", 2, 1800.0)
+    assert rankings["S2022T00", 2, "rating"] == 1800.0
+
+    rankings.initialize_new_ranking("S2022T01", "S2022T00")
+    rankings["S2022T01", 1, "rating"] = 1900.0
+    rankings.sort_rankings()
+
+    assert list(rankings["S2022T01"].pid) == [1, 2]
+    assert rankings["S2022T00", 1, "rating"] == 1500.0
+    assert rankings["S2022T01", 1, "rating"] == 1900.0
+    assert rankings["S2022T01", 3] is None
+    assert rankings["S2022T02"] is None
+    assert rankings._get_tids_list() == ["S2022T00", "S2022T01"]
+
+    ranking_df = rankings.ranking_df
+    assert list(ranking_df.tid) == ["S2022T00", "S2022T00", "S2022T01", "S2022T01"]
+    assert list(ranking_df.pid) == [2, 1, 1, 2]
+    assert ranking_df.index.equals(pd.RangeIndex(4))
+
+    # Rankings pickled as a single DataFrame are split into blocks
+    state = pickle.loads(pickle.dumps(rankings)).__dict__
+    for attr in ("_columns", "_blocks", "_pending_rows", "_to_categorize", "_unsorted_tids"):
+        state.pop(attr)
+    legacy_rankings = models.Rankings.__new__(models.Rankings)
+    legacy_rankings.__setstate__({**state, "ranking_df": ranking_df})
+    assert_frame_equal(legacy_rankings.ranking_df, ranking_df)
+    assert legacy_rankings["S2022T01", 1, "rating"] == 1900.0
+
+
+def test_rankings_update_many_and_scale_many():
+    ConfigManager().set_current_config(date="220101")
+    rankings = models.Rankings()
+    for pid, rating in [(1, 1500.0), (2, 1800.0), (3, 100.0)]:
+        rankings.add_new_entry("S2022T00", pid, rating)
+    rankings["S2022T00", 1, "points_cat_1"] = 100.0
+
+    # Unknown pids are ignored, last value wins for repeated pids
+    rankings.update_many("S2022T00", [1, 2, 1, 9], "category", ["a", "b", "c", "z"])
+    rankings.update_many("S2022T00", pd.Series([3]), "rating", 200)
+    # Repeated pids are scaled once per occurrence
+    rankings.scale_many("S2022T00", [1, 1, 9], "points_cat_1", 0.5)
+
+    ranking_df = rankings["S2022T00"]
+    assert list(ranking_df.category) == ["c", "b", "tercera"]
+    assert list(ranking_df.rating) == [1500.0, 1800.0, 200.0]
+    assert ranking_df.rating.dtype == float
+    assert list(ranking_df.points_cat_1) == [25.0, 0.0, 0.0]
+
+
+def test_rankings_not_own_category_mask():
+    ConfigManager().set_current_config(date="220101")
+    cfg = ConfigManager().current_config
+    rankings = models.Rankings()
+    for pid, rating in [(1, 1500.0), (2, 1500.0), (3, 100.0), (4, 100.0)]:
+        rankings.add_new_entry("S2022T00", pid, rating)
+    rankings["S2022T00", 4, "category"] = cfg.categories[-1]
+    first, second = rankings["S2022T00", 1, "category"], rankings["S2022T00", 3, "category"]
+
+    best_rounds = pd.DataFrame(
+        {
+            "pid": [1, 2, 3, 3, 4],
+            "category": [first, second, first, second, first],
+            "best_round": ["final"] * 5,
+        }
+    )
+    mask = rankings.get_not_own_category_mask("S2022T00", [4, 3, 2, 1], best_rounds)
+
+    assert mask.tolist() == [False, False, True, False]
+
+
+def test_rankings_statistics_are_cached_per_tid():
+    ConfigManager().set_current_config(date="220101")
+    initial_tid = ConfigManager().current_config.initial_metadata.initial_tid
+    rankings = models.Rankings()
+    for pid in [1, 2, 3]:
+        rankings.add_new_entry(initial_tid, pid, 1000.0)
+    rankings.initialize_new_ranking("S2022T01", initial_tid)
+    rankings.update_many("S2022T01", [1, 2], "points_cat_1", 10.0)
+    rankings.update_many("S2022T01", [2], "points_cat_2", 5.0)
+    rankings.update_many("S2022T01", [1, 2, 3], "cum_points_cat_1", 10.0)
+
+    stats = rankings.get_statistics("S2022T01")
+    assert list(stats.index) == ["S2022T01"]
+    assert stats.index.name == "tid"
+    assert stats.loc["S2022T01", "participation_cat_1"] == 2
+    assert stats.loc["S2022T01", "participation_cat_2"] == 1
+    assert stats.loc["S2022T01", "participation_total"] == 2
+    assert stats.loc["S2022T01", "cum_participation_total"] == 3
+    assert list(stats.columns) == sorted(stats.columns)
+    assert "S2022T01" in rankings._statistics
+
+    # Changes on a tid are considered
+    rankings["S2022T01", 3, "points_cat_2"] = 5.0
+    assert rankings.get_statistics("S2022T01").loc["S2022T01", "participation_total"] == 3
+
+
+def test_top_tournaments_keeps_best_n_sorted_by_points_and_tid():
+    from ranking_table_tennis.models.rankings import _TopTournaments
+
+    top_tournaments = _TopTournaments(n_tournaments=2)
+    pids = pd.Series([1, 2])
+    top_tournaments.add("S2022T01", pids, pd.Series([100.0, 0.0]))
+    top_tournaments.add("S2022T02", pids, pd.Series([250.0, 50.0]))
+    top_tournaments.add("S2022T03", pids, pd.Series([100.0, 0.0]))
+
+    assert top_tournaments.best == {
+        1: [(250.0, "S2022T02"), (100.0, "S2022T03")],
+        2: [(50.0, "S2022T02")],
+    }
+    assert top_tournaments.participations == {1: 3, 2: 1}
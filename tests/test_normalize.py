@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from ranking_table_tennis import normalize
+
+
+def test_name_cache(tmp_path):
+    cache = normalize.NameCache(maxsize=2)
+
+    assert cache(" pérez,  juan ") == "Perez,  Juan"
+    assert cache("gómez, ana") == "Gomez, Ana"
+    assert cache(" pérez,  juan ") == "Perez,  Juan"
+    # The least recently used name is dropped
+    assert cache("lópez, luis") == "Lopez, Luis"
+    assert len(cache) == 2
+
+    filename = str(tmp_path / "names.pk")
+    cache.save(filename)
+    cache.save(filename)
+    # Temporary files are replaced into the cache file
+    assert [path.name for path in tmp_path.iterdir()] == ["names.pk"]
+    loaded = normalize.NameCache()
+    loaded.load(filename)
+    loaded.load(str(tmp_path / "missing.pk"))
+    assert len(loaded) == 2
+    assert loaded("lópez, luis") == "Lopez, Luis"
+
+
+def test_normalize_uniques():
+    names = pd.Series([" pérez, juan", np.nan, "GOMEZ, ANA", " pérez, juan"], index=[3, 1, 2, 0])
+    assert normalize.normalize_names(names).equals(
+        pd.Series(["Perez, Juan", np.nan, "Gomez, Ana", "Perez, Juan"], index=[3, 1, 2, 0])
+    )
+
+    rounds = pd.Series([" Final ", "zona", 3])
+    assert normalize.normalize_labels(rounds).tolist()[:2] == ["final", "zona"]
+    assert pd.isna(normalize.normalize_labels(rounds).iloc[2])
+    assert normalize.normalize_labels(pd.Series(["santa fe "]), "title").tolist() == ["Santa Fe"]
+
+
+def test_parse_dates_and_tids():
+    dates = normalize.parse_dates(
+        pd.Series(["2022-07-24", " 2022 02 27", "2022-07-24", "2021 12 24", "March 3, 2022"])
+    )
+    expected = pd.to_datetime(
+        ["2022-07-24", "2022-02-27", "2022-07-24", "2021-12-24", "2022-03-03"]
+    ).to_series(index=range(5))
+    assert dates.equals(expected)
+    # Ambiguous dates are parsed month first, as pandas infers them
+    assert normalize.parse_dates(pd.Series(["03/04/2023"])).tolist() == [pd.Timestamp("2023-03-04")]
+
+    tids = normalize.dense_rank_tids(dates)
+    assert tids.tolist() == ["S2022T04", "S2022T02", "S2022T04", "S2021T01", "S2022T03"]
+    assert normalize.dense_rank_tids(dates[:2], start=5).tolist() == ["S2022T06", "S2022T05"]
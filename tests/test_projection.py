@@ -0,0 +1,91 @@
+import dataclasses
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import base_run_before_tests
+from pandas.testing import assert_frame_equal
+
+from ranking_table_tennis import compute_rankings, helpers, preprocess, projection
+from ranking_table_tennis.configs import ConfigManager
+
+
+@pytest.fixture(scope="module", autouse=True)
+def run_before_tests():
+    """To be run once before all tests"""
+    base_run_before_tests()
+    preprocess.main()
+    compute_rankings.main()
+
+
+def test_fit_scale():
+    rng = np.random.default_rng(0)
+    diff = rng.uniform(-600, 600, 20000)
+    first_wins = rng.random(len(diff)) < 1 / (1 + 10 ** (-diff / 300))
+    rating_details = pd.DataFrame(
+        {
+            "winner_rating": np.where(first_wins, diff, 0),
+            "loser_rating": np.where(first_wins, 0, diff),
+        }
+    )
+
+    assert projection.fit_scale(rating_details) == pytest.approx(300, rel=0.1)
+    assert projection.fit_scale(rating_details.iloc[:0]) == 400
+
+
+def test_bit_reversed_bracket_slots():
+    assert projection._bit_reversed(3).tolist() == [0, 4, 2, 6, 1, 5, 3, 7]
+    assert projection._bit_reversed(0).tolist() == [0]
+
+
+def test_projection_without_tournaments_keeps_standings():
+    cfg = ConfigManager().current_config
+    rankings = helpers.load_from_pickle(cfg.io.pickle.rankings)
+    last_ranking = rankings[rankings.ranking_df.tid.max()]
+
+    projected = projection.main(n_tournaments=0, n_simulations=10, seed=0)
+
+    ratings = projected["ratings"].sort_index()
+    assert (ratings.rating_mean == last_ranking.set_index("pid").rating.sort_index()).all()
+    assert (ratings.promotion == 0).all()
+    # Champions are the current leaders of each championship
+    champions = projected["championships"].query("champion == 1")
+    for category, points_col in zip(cfg.categories, rankings.cum_points_cat_columns()):
+        leader_points = last_ranking[points_col].max()
+        if leader_points > 0:
+            assert champions.set_index("category").loc[category, "points"] == leader_points
+
+
+def test_projection_distributions():
+    projected = projection.main(n_tournaments=3, n_simulations=1500, seed=1)
+    ratings = projected["ratings"]
+    categories = ConfigManager().current_config.categories[:-1]
+
+    assert np.allclose(ratings.loc[:, categories].sum(axis=1), 1)
+    assert (
+        (ratings.rating_p10 <= ratings.rating_p50) & (ratings.rating_p50 <= ratings.rating_p90)
+    ).all()
+    champions = projected["championships"].groupby("category").champion.sum()
+    assert np.allclose(champions, 1)
+    assert (projected["championships"].podium >= projected["championships"].champion).all()
+
+    # Chunks have their own seeds, so results don't depend on the number of jobs
+    projected_in_parallel = projection.main(n_tournaments=3, n_simulations=1500, seed=1, jobs=2)
+    assert_frame_equal(projected_in_parallel["ratings"], ratings)
+
+
+def test_load_season_requires_points_of_rounds():
+    cfg = ConfigManager().current_config
+    tournaments = helpers.load_from_pickle(cfg.io.pickle.tournaments)
+    players = helpers.load_from_pickle(cfg.io.pickle.players)
+    rankings = helpers.load_from_pickle(cfg.io.pickle.rankings)
+    # Group stage is left out of the points table, as an override could do
+    rankings.rules = dataclasses.replace(
+        rankings.rules,
+        round_names=tuple(
+            name for name in rankings.rules.round_names if name != cfg.roundnames.group_stage
+        ),
+    )
+
+    with pytest.raises(ValueError, match=cfg.roundnames.group_stage):
+        projection.load_season(tournaments, players, rankings, list(tournaments)[-1])
@@ -0,0 +1,69 @@
+import pytest
+from conftest import (
+    base_cli_run_after_tests,
+    base_run_before_tests,
+    config_initial_date_for_cli,
+    get_config_initial_date,
+)
+from pandas.testing import assert_frame_equal
+
+from ranking_table_tennis import compute_rankings, helpers, rebuild
+from ranking_table_tennis.configs import ConfigManager
+
+
+def test_parse_seasons():
+    assert rebuild.parse_seasons("2022") == [2022]
+    assert rebuild.parse_seasons("2021-2023") == [2021, 2022, 2023]
+    assert rebuild.parse_seasons("2024, 2021-2022,2022") == [2021, 2022, 2024]
+    assert rebuild.season_initial_date(2022) == "220101"
+
+
+def test_parse_seasons_without_config():
+    with pytest.raises(ValueError, match="2019"):
+        rebuild.parse_seasons("2019-2021")
+    with pytest.raises(ValueError):
+        rebuild.parse_seasons("last")
+
+
+def test_seasons_do_not_share_files(monkeypatch):
+    seasons = [2021, 2022, 2023]
+    rebuild.check_isolated_files(seasons)
+    assert not rebuild.season_files(2021) & rebuild.season_files(2022)
+
+    # A file without the year of the season would be written by every worker
+    monkeypatch.setattr(rebuild, "season_files", lambda season: {"data_rtt/shared.pk"})
+    with pytest.raises(ValueError, match="shared.pk"):
+        rebuild.check_isolated_files(seasons)
+
+
+def test_run_season_matches_full_compute(ref_ranking_df):
+    base_run_before_tests()
+    n_tournaments = rebuild.run_season(
+        get_config_initial_date(), download=False, check_updates=False
+    )
+    assert n_tournaments == 4
+
+    cfg = ConfigManager().current_config
+    rankings_rebuilt = helpers.load_from_pickle(cfg.io.pickle.rankings)
+    # Tournaments are computed incrementally, results are the same computing all of them
+    compute_rankings.main(get_config_initial_date())
+    rankings_computed = helpers.load_from_pickle(cfg.io.pickle.rankings)
+
+    assert_frame_equal(rankings_rebuilt.ranking_df, rankings_computed.ranking_df)
+    assert_frame_equal(rankings_rebuilt.rating_details_df, rankings_computed.rating_details_df)
+    assert_frame_equal(
+        rankings_rebuilt.championship_details_df, rankings_computed.championship_details_df
+    )
+    assert_frame_equal(rankings_rebuilt.ranking_df, ref_ranking_df)
+
+
+def test_cli_automatic(shell, ref_ranking_df):
+    base_run_before_tests()
+    ret = shell.run("rtt", "automatic", "--dont-download", *config_initial_date_for_cli())
+    assert ret.returncode == 0
+    print(ret.stdout)
+    base_cli_run_after_tests()
+
+    cfg = ConfigManager().current_config
+    rankings_output = helpers.load_from_pickle(cfg.io.pickle.rankings)
+    assert_frame_equal(rankings_output.ranking_df, ref_ranking_df)
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+from conftest import base_run_before_tests
+
+from ranking_table_tennis import preprocess, sweep
+from ranking_table_tennis.configs import ConfigManager
+
+
+@pytest.fixture(scope="module", autouse=True)
+def run_before_tests():
+    """To be run once before all tests"""
+    base_run_before_tests()
+    preprocess.main()
+
+
+def test_expand_grid_and_overrides():
+    grid = {"compute.rating_factor": [1.5, 2.0], "compute.categories_thresholds": [[1000, 500]]}
+    variants = sweep.expand_grid(grid)
+
+    assert variants == [
+        {"compute.rating_factor": 1.5, "compute.categories_thresholds": [1000, 500]},
+        {"compute.rating_factor": 2.0, "compute.categories_thresholds": [1000, 500]},
+    ]
+    assert sweep.to_overrides(variants[0]) == {
+        "compute": {"rating_factor": 1.5, "categories_thresholds": [1000, 500]}
+    }
+
+
+def test_sweep_variants(ref_ranking_df):
+    summary = sweep.main({"compute.rating_factor": [4.0]}, jobs=2)
+
+    # Config files are not modified by variants
+    assert ConfigManager().current_config.compute.rating_factor == 2.0
+    assert summary["variants"].loc[1, "compute.rating_factor"] == "4.0"
+
+    # Variant 0 has no overrides, its ratings are the ones of rtt compute
+    ratings = summary["ratings"].loc[0].set_index("pid")
+    last_tid = ref_ranking_df.tid.max()
+    ref_ratings = ref_ranking_df.loc[ref_ranking_df.tid == last_tid].set_index("pid")
+    assert ratings.rating.to_dict() == ref_ratings.rating.to_dict()
+    assert ratings.category.to_dict() == ref_ratings.category.to_dict()
+
+    # Another rating factor changes ratings of players that played
+    variant_ratings = summary["ratings"].loc[1].set_index("pid").rating
+    assert not variant_ratings.sort_index().equals(ratings.rating.sort_index())
+
+    assert set(summary["champions"].index) == {0, 1}
+    cfg = ConfigManager().current_config
+    assert os.path.exists(cfg.io.data_folder + cfg.io.xlsx.sweep_filename)
+
+
+@pytest.mark.parametrize(
+    "grid", [{"compute.categories_thresholds": [[1000]]}, {"compute.fan_category": [3]}]
+)
+def test_sweep_rejects_changes_of_categories(grid):
+    categories = list(ConfigManager().get_valid_config("220101").categories)
+    with pytest.raises(ValueError, match="changing the categories"):
+        sweep.main(grid)
+
+    # Config files values are restored
+    assert list(ConfigManager().get_valid_config("220101").categories) == categories